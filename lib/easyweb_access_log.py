@@ -0,0 +1,164 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb 的可选模块：保存在内存中的访问日志，由 EasyWeb.enable_access_log() 导入，三个版本的 EasyWeb 通用
+import os
+import time
+import binascii
+from array import array
+try:
+    from time import ticks_ms, ticks_diff
+except ImportError:  # CPython：使用单调时钟模拟 MicroPython 的 ticks 函数
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+class _AccessLog:
+    """
+    保存在内存中的访问日志环形缓冲区，可以定期批量写入文件以减少对 Flash 的写入
+
+    每条记录包含：时间，请求方法，路径哈希（CRC32），状态码，发送字节数，处理耗时（毫秒）
+    """
+    METHODS = ('GET', 'POST', 'PUT', 'DELETE', 'HEAD', 'OPTIONS', 'PATCH', '-')
+
+    def __init__(self, size: int = 64, file: str = None, max_size: int = 16384, batch: int = 32,
+                 interval: int = 60):
+        self.size = size
+        '缓冲区可以保存的记录数量'
+        self.file = file
+        '日志文件的路径，为 None 时只保存在内存中'
+        self.max_size = max_size
+        '日志文件的最大长度（字节），超出时将其重命名为 "<file>.1" 并重新开始写入'
+        self.batch = batch
+        '积累的记录数量达到该值时写入文件'
+        self.interval = interval
+        '距离上次写入超过该时间（秒）时写入文件'
+        self.times = array('L', [0] * size)
+        self.methods = bytearray(size)
+        self.hashes = array('L', [0] * size)
+        self.status = array('H', [0] * size)
+        self.sent = array('L', [0] * size)
+        self.ms = array('L', [0] * size)
+        self.count = 0
+        '记录的总数'
+        self.flushed = 0
+        '已写入文件的记录总数'
+        self.dropped = 0
+        '写入文件前就被覆盖的记录数'
+        self.last_flush = ticks_ms()
+        self.paths = {}
+        '路径哈希与路径的对照表，只保存最早出现的 size 个路径，用于查看日志'
+
+    def record(self, method: str, path: str, status: int, sent: int, ms: int):
+        """添加一条记录"""
+        i = self.count % self.size
+        self.times[i] = int(time.time())
+        try:
+            self.methods[i] = self.METHODS.index(method)
+        except ValueError:
+            self.methods[i] = len(self.METHODS) - 1
+        h = binascii.crc32(path.encode())
+        self.hashes[i] = h
+        if h not in self.paths and len(self.paths) < self.size:
+            self.paths[h] = path
+        self.status[i] = status
+        self.sent[i] = sent
+        self.ms[i] = ms
+        self.count += 1
+
+    def pending(self):
+        """
+        是否需要写入文件：积累的记录数量达到 batch，或距离上次写入超过 interval
+
+        Returns:
+            bool
+        """
+        if not self.file or self.count == self.flushed:
+            return False
+        return (self.count - self.flushed >= self.batch or
+                ticks_diff(ticks_ms(), self.last_flush) >= self.interval * 1000)
+
+    def wait_time(self):
+        """
+        距离按 interval 写入文件还需等待的时间（秒）
+
+        Returns:
+            float / None: 没有需要写入文件的记录时为 None
+        """
+        if not self.file or self.count == self.flushed:
+            return None
+        return max(self.interval - ticks_diff(ticks_ms(), self.last_flush) / 1000, 0)
+
+    def lines(self, start: int = None):
+        """
+        逐行生成日志记录（从旧到新）
+
+        Args:
+            start: 从第几条记录开始，默认为缓冲区中最早的记录
+
+        Returns:
+            生成器，每行为 "时间 请求方法 路径哈希 状态码 发送字节数 耗时\\n"
+        """
+        first = max(self.count - self.size, 0)
+        if start is None or start < first:
+            start = first
+        for n in range(start, self.count):
+            i = n % self.size
+            yield '{} {} {:08x} {} {} {}\n'.format(self.times[i], self.METHODS[self.methods[i]], self.hashes[i],
+                                                   self.status[i], self.sent[i], self.ms[i])
+
+    def flush(self):
+        """将尚未写入的记录批量写入日志文件"""
+        if not self.file or self.count == self.flushed:
+            return
+        self.write(*self.collect())
+
+    def collect(self):
+        """
+        取出尚未写入文件的记录，用于在锁内只复制记录，在锁外写入文件
+
+        Returns:
+            (str, int): 日志文本，以及其中最后一条记录之后的记录总数（传给 write()）
+        """
+        self.last_flush = ticks_ms()  # 写入失败时也等到下一个间隔再重试
+        return ''.join(self.lines(self.flushed)), self.count
+
+    def write(self, text: str, count: int):
+        """
+        将 collect() 取出的日志文本写入文件，日志文件超出 max_size 时进行轮转
+
+        Args:
+            text: 日志文本
+            count: collect() 返回的记录总数
+        """
+        try:
+            if os.stat(self.file)[6] >= self.max_size:  # 日志轮转
+                try:
+                    os.remove(self.file + '.1')
+                except OSError:
+                    pass
+                os.rename(self.file, self.file + '.1')
+        except OSError:
+            pass
+        with open(self.file, 'a') as f:
+            f.write(text)
+        first = max(count - self.size, 0)
+        if self.flushed < first:  # 写入之前缓冲区已被覆盖
+            self.dropped += first - self.flushed
+        self.flushed = count
+
+    def page(self):
+        """
+        以文本形式输出缓冲区中的记录（从旧到新），路径哈希会尽量替换为路径
+
+        Returns:
+            生成器，首先产生响应头，然后逐行产生日志（bytes）
+        """
+        yield {'Content-Type': 'text/plain; charset=utf-8'}
+        for line in self.lines():
+            t, m, h, rest = line.split(' ', 3)
+            yield '{} {} {} {}'.format(t, m, self.paths.get(int(h, 16), h), rest).encode()
@@ -0,0 +1,56 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb 的可选模块：请求录制，由 EasyWeb.enable_capture() 导入，三个版本的 EasyWeb 通用
+try:
+    from time import ticks_ms
+except ImportError:  # CPython：使用单调时钟模拟 MicroPython 的 ticks 函数
+    import time
+
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+
+class _Capture:
+    """
+    请求录制：将服务器读取到的原始请求数据与到达时间写入文件，可以使用 tools/replay.py 回放
+
+    文件由连续的记录组成，每条记录为一行 "到达时间（毫秒） 状态码 处理耗时（微秒） 长度\\n"，后接 长度 字节的原始请求
+    """
+
+    def __init__(self, file: str, max_size: int = 65536):
+        self.file = file
+        '录制文件的路径'
+        self.max_size = max_size
+        '录制文件的最大长度（字节），超出后不再录制'
+        self.size = 0
+        '已写入的字节数'
+        self.count = 0
+        '已录制的请求数'
+        self.dropped = 0
+        '因文件长度限制未录制的请求数'
+        self.start = ticks_ms()
+        with open(file, 'wb'):  # 清空录制文件
+            pass
+
+    def record(self, arrival: int, parts: list, status: int, us: int):
+        """
+        写入一条记录
+
+        Args:
+            arrival: 请求到达的时间（毫秒，从开始录制时计算）
+            parts: 读取到的原始数据片段
+            status: 响应的状态码，未发送响应时为 0
+            us: 处理耗时（微秒）
+        """
+        data = b''.join(parts)
+        head = '{} {} {} {}\n'.format(arrival, status, us, len(data)).encode()
+        if self.size + len(head) + len(data) > self.max_size:
+            self.dropped += 1
+            return
+        with open(self.file, 'ab') as f:
+            f.write(head)
+            f.write(data)
+        self.size += len(head) + len(data)
+        self.count += 1
@@ -0,0 +1,149 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb（asyncio 版本）的可选模块：发布/订阅中心，由 EasyWeb.hub() 导入
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython
+    import asyncio
+try:
+    from .easyweb import json, sse_event
+except ImportError:  # easyweb 不在包中
+    from easyweb import json, sse_event
+
+
+class _Subscriber:
+    """
+    发布/订阅中心的订阅者，作为 event_stream() 的事件源（异步迭代器），逐个产生发送队列中已编码的事件
+    """
+
+    def __init__(self, hub):
+        self.hub = hub
+        '所属的发布/订阅中心，取消订阅后为 None'
+        self.outbox = []
+        '发送队列'
+        self.dropped = False
+        '是否因消费过慢被移除'
+        self.ready = asyncio.Event()
+        '发送队列中有新的消息'
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self.outbox:
+            if self.hub is None:  # 已取消订阅或因消费过慢被移除
+                raise StopAsyncIteration
+            self.ready.clear()
+            await self.ready.wait()
+        return self.outbox.pop(0)
+
+    async def aclose(self):
+        """取消订阅，事件流结束时由服务器调用"""
+        if self.hub is not None:
+            self.hub.leave(self)
+
+
+class _Hub:
+    """
+    发布/订阅中心：每条消息只序列化一次，编码后共享的 bytes 放入每个订阅者（事件流或 WebSocket 连接）的发送队列；
+    发送队列已满（消费过慢）的订阅者会被移除，不会阻塞发布者与其他订阅者
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        '每个订阅者最多积压的消息数量，超出时移除该订阅者'
+        self.subscribers = []
+        '订阅者（_Subscriber 或 _WebSocket）'
+        self.dropped = 0
+        '因消费过慢被移除的订阅者数量'
+
+    def subscribe(self):
+        """
+        订阅消息
+
+        Returns:
+            _Subscriber: 用于 event_stream() 的事件源，事件流结束时自动取消订阅
+
+        Example:
+            @app.route("/events")
+            def events(request):
+                return event_stream(hub.subscribe())
+        """
+        subscriber = _Subscriber(self)
+        self.subscribers.append(subscriber)
+        return subscriber
+
+    def join(self, ws):
+        """
+        将 WebSocket 连接加入订阅者，通常在 on_open 中调用；连接关闭时自动移除
+
+        Args:
+            ws: WebSocket 连接
+        """
+        if ws not in self.subscribers:
+            self.subscribers.append(ws)
+            ws.hubs.append(self)
+            if ws.task is None:  # 启动发送任务
+                ws.task = asyncio.create_task(ws._deliver())
+
+    def leave(self, subscriber):
+        """
+        移除订阅者
+
+        Args:
+            subscriber: subscribe() 的返回值或 WebSocket 连接
+        """
+        self._remove(subscriber)
+
+    def _remove(self, subscriber):
+        """移除订阅者并唤醒其发送任务"""
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        if type(subscriber) is _Subscriber:
+            subscriber.hub = None
+        elif self in subscriber.hubs:  # WebSocket 连接
+            subscriber.hubs.remove(self)
+        subscriber.ready.set()
+
+    def publish(self, data, event: str = None, id=None):
+        """
+        向全部订阅者发送消息
+
+        Args:
+            data: 消息，可以为 str, bytes 或可以序列化为 JSON 的 dict, list；
+                WebSocket 连接中 bytes 作为二进制消息发送，其它作为文本消息发送
+            event: 事件类型，只用于事件流
+            id: 事件 ID，只用于事件流
+
+        Returns:
+            int: 收到消息的订阅者数量
+        """
+        if not isinstance(data, (str, bytes)):
+            data = json.dumps(data)
+        sse = None  # 事件流与 WebSocket 分别只编码一次
+        frame = None
+        count = 0
+        for subscriber in self.subscribers[:]:
+            if len(subscriber.outbox) >= self.queue_size:  # 消费过慢
+                subscriber.dropped = True
+                subscriber.outbox.clear()
+                self._remove(subscriber)
+                self.dropped += 1
+                continue
+            if type(subscriber) is _Subscriber:
+                if sse is None:
+                    sse = sse_event(data, event, id)
+                subscriber.outbox.append(sse)
+            else:  # WebSocket 连接
+                if frame is None:
+                    if isinstance(data, bytes):
+                        frame = subscriber.header(subscriber.OP_BINARY, len(data)) + data
+                    else:
+                        payload = data.encode()
+                        frame = subscriber.header(subscriber.OP_TEXT, len(payload)) + payload
+                subscriber.outbox.append(frame)
+            subscriber.ready.set()
+            count += 1
+        return count
@@ -0,0 +1,115 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb 的可选模块：按路由的请求统计，由 EasyWeb.enable_metrics() 导入，三个版本的 EasyWeb 通用
+from array import array
+
+
+class _Metrics:
+    """
+    按路由统计请求数、状态码、收发字节数与处理耗时
+
+    所有计数都保存在定长的 array 中，每个路由占用一行，添加路由时才会扩展，处理请求时不会分配内存
+    """
+    BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+    '耗时直方图各个分桶的上限（毫秒），最后还有一个 +Inf 分桶'
+    FIELDS = 8
+    '每行的计数：请求数，1xx ~ 5xx（共 5 个），接收字节数，发送字节数'
+
+    def __init__(self):
+        self.names = ['-']
+        '各行对应的路由，第 0 行用于统计未匹配到路由的请求'
+        self.counts = array('L', [0] * self.FIELDS)
+        self.hist = array('L', [0] * (len(self.BUCKETS) + 1))
+        '耗时直方图（非累计）'
+        self.time_ms = array('L', [0])
+        '各个路由的总耗时（毫秒）'
+
+    def add(self, name: str):
+        """为新的路由添加一行计数"""
+        self.names.append(name)
+        self.counts.extend(array('L', [0] * self.FIELDS))
+        self.hist.extend(array('L', [0] * (len(self.BUCKETS) + 1)))
+        self.time_ms.append(0)
+
+    def record(self, row: int, status: int, received: int, sent: int, us: int):
+        """
+        记录一次请求
+
+        Args:
+            row: 路由所在的行，0 表示未匹配到路由
+            status: HTTP 状态码
+            received: 接收的字节数
+            sent: 发送的字节数
+            us: 处理耗时（微秒）
+        """
+        i = row * self.FIELDS
+        c = self.counts
+        c[i] += 1
+        if 100 <= status < 600:
+            c[i + status // 100] += 1
+        c[i + 6] += received
+        c[i + 7] += sent
+        ms = us // 1000
+        self.time_ms[row] += ms
+        n = len(self.BUCKETS)
+        b = 0
+        while b < n and ms >= self.BUCKETS[b]:
+            b += 1
+        self.hist[row * (n + 1) + b] += 1
+
+    def prometheus(self):
+        """
+        以 Prometheus 文本格式输出统计数据
+
+        Returns:
+            生成器，首先产生响应头，然后逐行产生统计数据（bytes）
+        """
+        yield {'Content-Type': 'text/plain; version=0.0.4'}
+        n = len(self.BUCKETS) + 1
+        for name, k in (('requests', 0), ('received_bytes', 6), ('sent_bytes', 7)):
+            yield '# TYPE easyweb_{}_total counter\n'.format(name).encode()
+            for row, route in enumerate(self.names):
+                yield 'easyweb_{}_total{{route="{}"}} {}\n'.format(
+                    name, route, self.counts[row * self.FIELDS + k]).encode()
+        yield b'# TYPE easyweb_responses_total counter\n'
+        for row, route in enumerate(self.names):
+            for s in range(1, 6):
+                yield 'easyweb_responses_total{{route="{}",status="{}xx"}} {}\n'.format(
+                    route, s, self.counts[row * self.FIELDS + s]).encode()
+        yield b'# TYPE easyweb_request_duration_seconds histogram\n'
+        for row, route in enumerate(self.names):
+            total = 0
+            for b in range(n):
+                total += self.hist[row * n + b]
+                le = self.BUCKETS[b] / 1000 if b < len(self.BUCKETS) else '+Inf'
+                yield 'easyweb_request_duration_seconds_bucket{{route="{}",le="{}"}} {}\n'.format(
+                    route, le, total).encode()
+            yield 'easyweb_request_duration_seconds_sum{{route="{}"}} {}\n'.format(
+                route, self.time_ms[row] / 1000).encode()
+            yield 'easyweb_request_duration_seconds_count{{route="{}"}} {}\n'.format(route, total).encode()
+
+    def json(self):
+        """
+        以字典形式输出统计数据
+
+        Returns:
+            dict: {路由: {"requests", "status", "received", "sent", "time_ms", "histogram"}}
+        """
+        n = len(self.BUCKETS) + 1
+        result = {}
+        for row, route in enumerate(self.names):
+            i = row * self.FIELDS
+            hist = {}
+            for b in range(n):
+                hist[str(self.BUCKETS[b]) if b < len(self.BUCKETS) else '+Inf'] = self.hist[row * n + b]
+            result[route] = {
+                'requests': self.counts[i],
+                'status': {'{}xx'.format(s): self.counts[i + s] for s in range(1, 6)},
+                'received': self.counts[i + 6],
+                'sent': self.counts[i + 7],
+                'time_ms': self.time_ms[row],
+                'histogram': hist
+            }
+        return result
@@ -0,0 +1,73 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb 的可选模块：请求处理流程的分阶段耗时统计，由 EasyWeb.enable_profiling() 导入，三个版本的 EasyWeb 通用
+import time
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:  # CPython：使用单调时钟模拟 MicroPython 的 ticks 函数
+    def ticks_us():
+        return int(time.monotonic() * 1000000)
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+
+
+class _Profiler:
+    """
+    记录请求各个阶段的耗时，并保存最近的慢请求
+    """
+    PHASES = ('parse', 'match', 'body', 'handler', 'render', 'write')
+    '阶段：解析请求行与请求头，匹配路由，读取请求体，路由处理函数，生成响应内容（含模板渲染），发送响应'
+
+    def __init__(self, hook=None, slow_ms: int = 100, size: int = 8):
+        self.hook = hook
+        '每个请求完成后调用的函数 hook(request, timings)，timings 为 {阶段: 耗时（微秒）}'
+        self.slow_ms = slow_ms
+        '慢请求的阈值（毫秒）'
+        self.slow = [None] * size
+        '慢请求环形缓冲区'
+        self.index = 0
+        '下一条慢请求写入的位置'
+
+    @staticmethod
+    def mark(times: list, phase: int, t: int):
+        """
+        将从 t 开始到现在的耗时累加到指定阶段
+
+        Returns:
+            int: 当前的时间（微秒），作为下一个阶段的开始时间
+        """
+        now = ticks_us()
+        times[phase] += ticks_diff(now, t)
+        return now
+
+    def report(self, request, status: int, times: list):
+        """
+        报告一个请求的各阶段耗时：调用用户函数，并在超出阈值时记录到慢请求缓冲区
+
+        Args:
+            request: 请求对象
+            status: HTTP 状态码
+            times: 各个阶段的耗时（微秒）
+        """
+        timings = dict(zip(self.PHASES, times))
+        if self.hook is not None:
+            try:
+                self.hook(request, timings)
+            except Exception as e:
+                print("[WARN] EasyWEB: Profiling hook - {}".format(e))
+        total = sum(times) // 1000
+        if total >= self.slow_ms and self.slow:
+            self.slow[self.index] = (time.time(), request.method, request.full_path, status, total, timings)
+            self.index = (self.index + 1) % len(self.slow)
+
+    def slow_requests(self):
+        """
+        获取最近的慢请求，按时间顺序排列
+
+        Returns:
+            list: [(时间戳, 请求方法, 完整路径, 状态码, 总耗时（毫秒）, {阶段: 耗时（微秒）}), ...]
+        """
+        return [r for r in self.slow[self.index:] + self.slow[:self.index] if r is not None]
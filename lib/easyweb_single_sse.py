@@ -0,0 +1,93 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb（单线程版本）的可选模块：服务器推送事件（Server-Sent Events）响应，由 event_stream() 导入
+try:
+    from .easyweb_single import ticks_ms, ticks_diff, sse_event
+except ImportError:  # easyweb_single 不在包中
+    from easyweb_single import ticks_ms, ticks_diff, sse_event
+
+
+class _EventStream:
+    """
+    服务器推送事件（Server-Sent Events）响应，由 event_stream() 创建：发送响应头后保持连接，逐个发送事件源产生的事件
+    """
+    __slots__ = ('source', 'heartbeat', 'interval', 'retry', 'status_code', 'headers')
+    HEARTBEAT = b":\n\n"
+    '心跳（注释行），浏览器会忽略'
+
+    def __init__(self, source, heartbeat: float = 15, interval: float = 1, retry: int = None):
+        self.source = source
+        '事件源'
+        self.heartbeat = heartbeat
+        '没有事件时发送心跳的间隔（秒），用于保持连接并检测已断开的客户端'
+        self.interval = interval
+        '同步事件源产生 None（暂时没有事件）后，再次轮询的间隔（秒）'
+        self.retry = retry
+        '连接断开后浏览器重新连接的等待时间（毫秒），为 None 时使用浏览器的默认值'
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+
+    def get_response(self, head: bool = False):
+        """
+        获取响应头生成器，事件由服务器在发送响应头之后逐个发送
+
+        Args:
+            head: 是否为 HEAD 请求
+
+        Returns:
+            产生响应头的生成器
+        """
+        yield ("HTTP/1.1 200 OK\r\n" + "".join(["{}: {}\r\n".format(k, v) for k, v in self.headers.items()]) +
+               "\r\n").encode()
+        if self.retry is not None and not head:
+            yield "retry: {}\n\n".format(self.retry).encode()
+
+    def _open(self, app, conn, data: bytes):
+        """发送响应头后调用；事件由 _poll() 在等待新连接的间隙发送，客户端发送的数据会被忽略"""
+
+    def _poll(self, app, st: list):
+        """
+        轮询事件流：发送事件源产生的全部事件，没有事件时按需发送心跳，关闭已结束或客户端已断开的事件流
+
+        Args:
+            app: EasyWeb 对象
+            st: EasyWeb.streams 中的 [conn, self, 最后一次发送数据的时间]
+        """
+        conn = st[0]
+        try:
+            while True:
+                event = next(self.source)
+                if event is None:  # 暂时没有事件
+                    if _closed(conn):
+                        raise OSError('closed')
+                    if ticks_diff(ticks_ms(), st[2]) < self.heartbeat * 1000:
+                        break
+                    event = self.HEARTBEAT
+                elif type(event) is not bytes:
+                    event = sse_event(event)
+                app._write(conn, event)
+                st[2] = ticks_ms()
+                if event is self.HEARTBEAT:
+                    break
+        except Exception as e:  # 事件源结束或客户端已断开
+            if not isinstance(e, (StopIteration, OSError)):
+                print("[WARN] EasyWEB: {}".format(e))
+            app.streams.remove(st)
+            self._end()
+            conn.close()
+
+    def _end(self):
+        """结束事件源，执行其中的清理代码；事件流结束、HEAD 请求或未能保持连接（超出 max_streams）时调用"""
+        if hasattr(self.source, 'close'):
+            self.source.close()
+
+
+def _closed(conn):
+    """检查客户端是否已关闭连接（不等待）"""
+    try:
+        conn.settimeout(0)
+        return conn.recv(16) == b''  # 读取到 EOF；客户端发送的数据会被丢弃
+    except OSError:  # 没有可读取的数据
+        return False
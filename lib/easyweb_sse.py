@@ -0,0 +1,139 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb（asyncio 版本）的可选模块：服务器推送事件（Server-Sent Events）响应，由 event_stream() 导入
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython
+    import asyncio
+try:
+    from .easyweb import ticks_ms, ticks_diff, sse_event
+except ImportError:  # easyweb 不在包中
+    from easyweb import ticks_ms, ticks_diff, sse_event
+
+
+class _EventStream:
+    """
+    服务器推送事件（Server-Sent Events）响应，由 event_stream() 创建：发送响应头后保持连接，逐个发送事件源产生的事件
+    """
+    __slots__ = ('source', 'heartbeat', 'interval', 'retry', 'status_code', 'headers')
+    HEARTBEAT = b":\n\n"
+    '心跳（注释行），浏览器会忽略'
+
+    def __init__(self, source, heartbeat: float = 15, interval: float = 1, retry: int = None):
+        self.source = source
+        '事件源'
+        self.heartbeat = heartbeat
+        '没有事件时发送心跳的间隔（秒），用于保持连接并检测已断开的客户端'
+        self.interval = interval
+        '同步事件源产生 None（暂时没有事件）后，再次轮询的间隔（秒）'
+        self.retry = retry
+        '连接断开后浏览器重新连接的等待时间（毫秒），为 None 时使用浏览器的默认值'
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'}
+
+    def get_response(self, head: bool = False):
+        """
+        获取响应头生成器，事件由服务器在发送响应头之后逐个发送
+
+        Args:
+            head: 是否为 HEAD 请求
+
+        Returns:
+            产生响应头的生成器
+        """
+        yield ("HTTP/1.1 200 OK\r\n" + "".join(["{}: {}\r\n".format(k, v) for k, v in self.headers.items()]) +
+               "\r\n").encode()
+        if self.retry is not None and not head:
+            yield "retry: {}\n\n".format(self.retry).encode()
+
+    async def _serve(self, app, reader, writer, data: bytes):
+        """
+        发送事件流：在后台任务中发送事件源产生的事件，没有事件时定期发送心跳，直到事件源结束或客户端断开
+
+        Args:
+            app: EasyWeb 对象
+            reader: 用于从客户端读取数据的流
+            writer: 用于向客户端发送数据的流
+            data: 读取器中已缓冲的数据（忽略）
+
+        Returns:
+            int: 已发送的字节数（不含响应头）
+        """
+        state = [0, ticks_ms(), asyncio.Lock()]  # 已发送的字节数，最后一次发送的时间，发送数据的锁（两个任务不能同时等待发送）
+        done = asyncio.Event()
+        pump = asyncio.create_task(self._pump(app, writer, state, done))
+        watch = asyncio.create_task(_watch_closed(reader, done))
+        try:
+            while not done.is_set():
+                try:
+                    await asyncio.wait_for(done.wait(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    if ticks_diff(ticks_ms(), state[1]) >= self.heartbeat * 1000:
+                        async with state[2]:
+                            await app._write(writer, self.HEARTBEAT)
+                        state[0] += len(self.HEARTBEAT)
+                        state[1] = ticks_ms()
+        finally:
+            for task in (pump, watch):
+                if not task.done():
+                    task.cancel()
+        return state[0]
+
+    async def _pump(self, app, writer, state: list, done):
+        """后台任务：从事件源取出事件并发送，事件源结束或发送失败时设置 done"""
+        source = self.source
+        is_async = hasattr(source, '__anext__')
+        try:
+            while True:
+                if is_async:
+                    try:
+                        event = await source.__anext__()
+                    except StopAsyncIteration:
+                        break
+                else:
+                    try:
+                        event = next(source)
+                    except StopIteration:
+                        break
+                    if event is None:  # 暂时没有事件
+                        await asyncio.sleep(self.interval)
+                        continue
+                if event is None:
+                    continue
+                if type(event) is not bytes:
+                    event = sse_event(event)
+                async with state[2]:
+                    await app._write(writer, event)
+                state[0] += len(event)
+                state[1] = ticks_ms()
+        except (OSError, asyncio.TimeoutError):  # 客户端已断开
+            pass
+        except Exception as e:
+            print("[WARN] EasyWEB: {}".format(e))
+        finally:
+            done.set()
+            await self._end()
+
+    async def _end(self):
+        """结束事件源，执行其中的清理代码；事件流结束、HEAD 请求或未能保持连接（超出 max_streams）时调用"""
+        source = self.source
+        try:
+            if hasattr(source, '__anext__'):
+                if hasattr(source, 'aclose'):
+                    await source.aclose()
+            elif hasattr(source, 'close'):
+                source.close()
+        except Exception:
+            pass
+
+
+async def _watch_closed(reader, done):
+    """后台任务：客户端关闭连接（读取到 EOF）时设置 done；客户端发送的数据会被丢弃"""
+    try:
+        while await reader.read(64):
+            pass
+    except Exception:
+        pass
+    done.set()
@@ -10,11 +10,43 @@
 # https://blog.csdn.net/wapecheng/article/details/93522153
 # https://blog.csdn.net/qq_42482078/article/details/131514743
 # https://blog.csdn.net/weixin_41665106/article/details/105599235
+import gc
 import os
 import socket
 import _thread
+import time
 import binascii
-import ujson as json
+try:
+    import ujson as json
+except ImportError:  # CPython
+    import json
+try:
+    from io import IOBase
+except ImportError:  # 不支持 io.IOBase 的固件，流式 JSON 响应只能逐层编码
+    IOBase = object
+
+try:
+    from time import ticks_ms, ticks_us, ticks_add, ticks_diff
+except ImportError:  # CPython：使用单调时钟模拟 MicroPython 的 ticks 函数
+    def ticks_ms():
+        return int(time.monotonic() * 1000)
+
+    def ticks_us():
+        return int(time.monotonic() * 1000000)
+
+    def ticks_add(ticks, delta):
+        return ticks + delta
+
+    def ticks_diff(ticks1, ticks2):
+        return ticks1 - ticks2
+try:
+    from gc import mem_free, mem_alloc
+except ImportError:  # CPython：没有堆内存统计，视为内存充足
+    def mem_free():
+        return 1 << 30
+
+    def mem_alloc():
+        return 0
 
 # 文件类型对照
 FILE_TYPE = {
@@ -43,14 +75,106 @@ FILE_TYPE = {
 }  # 其他: "application/octet-stream"
 
 
+class _StatCache:
+    """
+    文件元数据缓存，减少在较慢的文件系统上重复调用 os.stat()，也会缓存文件不存在的结果
+
+    每一项为 路径 -> (缓存时间, (文件大小, 修改时间) / None)
+    """
+
+    def __init__(self, size: int = 32, ttl: int = 1000):
+        self.size = size
+        '最多缓存的路径数量'
+        self.ttl = ttl
+        '缓存的有效时间（毫秒），为 0 时不缓存'
+        self.lock = _thread.allocate_lock()
+        '缓存的锁，多个处理请求的线程会同时读写缓存；不在锁内调用 os.stat()'
+        self.entries = {}
+
+    def stat(self, path: str):
+        """
+        获取文件的元数据
+
+        Args:
+            path: 文件路径
+
+        Returns:
+            tuple / None: (文件大小, 修改时间)，文件不存在时为 None
+        """
+        now = ticks_ms()
+        with self.lock:
+            entry = self.entries.get(path)
+        if entry is not None and ticks_diff(now, entry[0]) < self.ttl:
+            return entry[1]
+        try:
+            info = os.stat(path)
+            info = (info[6], info[8])
+        except OSError:
+            info = None
+        if self.ttl > 0:
+            with self.lock:
+                if path not in self.entries and len(self.entries) >= self.size:  # 移除最早缓存的一项
+                    oldest = None
+                    for k, v in self.entries.items():
+                        if oldest is None or ticks_diff(v[0], oldest[1]) < 0:
+                            oldest = (k, v[0])
+                    self.entries.pop(oldest[0], None)
+                self.entries[path] = (now, info)
+        return info
+
+    def invalidate(self, path: str = None):
+        """
+        使缓存失效，修改、创建或删除文件后调用
+
+        Args:
+            path: 文件路径，为 None 时清空全部缓存
+        """
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(path, None)
+
+
+stat_cache = _StatCache()
+'文件元数据缓存，exists()，send_file()，render_template() 与静态文件目录共用'
+file_cache = None
+'小文件缓存（_FileCache），调用 EasyWeb.enable_file_cache() 后启用'
+
+
 def exists(path):
-    """文件是否存在"""
-    try:
-        os.stat(path)
-        return True
-    except:
-        print('[ERROR] EasyWeb: File Not Exists - {}'.format(path))
-        return False
+    """文件是否存在（使用文件元数据缓存）"""
+    return stat_cache.stat(path) is not None
+
+
+def _import(name: str):
+    """
+    导入与本模块位于同一目录（或同一个包）中的可选模块，例如 easyweb_metrics；
+    可选功能在第一次使用时才导入，没有使用的功能不需要上传到开发板，也不会占用内存
+
+    Args:
+        name: 模块名
+
+    Returns:
+        导入的模块
+    """
+    return __import__(__name__[:__name__.rfind('.') + 1] + name, None, None, ('*',))
+
+
+def _request_key(request, key):
+    """
+    根据请求路径与选定的参数生成缓存或合并请求使用的键
+
+    Args:
+        request: 请求对象
+        key: 参数名称列表，或者函数 key(request) -> str，为 None 时只使用请求路径
+    """
+    if key is None:
+        return request.path
+    if callable(key):
+        return request.path + '?' + key(request)
+    args = request.args or {}
+    return request.path + '?' + '&'.join([str(args.get(name, '')) for name in key])
 
 
 def url_encode(url):
@@ -93,6 +217,8 @@ class _Response:
     """
     表示 HTTP 响应的类
     """
+    # MicroPython 会忽略 __slots__，在支持的环境中可以使用固定的属性布局以减少内存占用
+    __slots__ = ('status_code', 'status', 'headers', 'cookies', 'charset', 'data')
     STATUS_CODE = {
         100: "Continue",
         101: "Switching Protocols",
@@ -156,12 +282,18 @@ class _Response:
     }
 
     def __init__(self):
+        self.headers = {}
+        self.cookies = {}
+        self._reset()
+
+    def _reset(self):
+        """重置响应对象，以便从对象池中复用"""
         self.status_code = 200
         'HTTP 状态码'
         self.status = None
         'HTTP 状态文本'
-        self.headers = {}
-        self.cookies = {}
+        self.headers.clear()
+        self.cookies.clear()
         self.charset = 'utf-8'
         self.data = b''
 
@@ -216,10 +348,15 @@ class _Response:
             c += "\r\n"
         return c
 
-    def get_response(self):
+    def get_response(self, head: bool = False):
         """
         获取完整的 HTTP 响应生成器
 
+        Args:
+            head: 是否只生成响应头（HEAD 请求）；生成器只运行到产生第一项为止，随后被关闭：
+                第一项为响应头字典时（例如 send_file()）不会运行产生响应体的部分，
+                第一项为响应体时，产生该项之前的代码仍会运行（需要避免副作用时可以先产生响应头字典）
+
         Returns:
             包含响应内容的生成器
         """
@@ -239,9 +376,11 @@ class _Response:
         else:
             yield "HTTP/1.1 {}\r\n".format(status).encode()
         if isinstance(self.data, bytes):
+            if head:
+                self.headers['Content-Length'] = len(self.data)
             yield ("\r\n".join([f"{k}: {v}" for k, v in self.headers.items()]) + "\r\n").encode()
             yield (self._get_cookies() + "\r\n").encode()
-            if self.data:
+            if self.data and not head:
                 yield self.data
         elif self.is_generator(self.data):
             i = True
@@ -252,6 +391,9 @@ class _Response:
                         self.headers.update(d)
                     yield ("\r\n".join([f"{k}: {v}" for k, v in self.headers.items()]) + "\r\n").encode()
                     yield (self._get_cookies() + "\r\n").encode()
+                    if head:  # 只发送响应头，关闭生成器；已经产生的第一项响应体被丢弃
+                        self.data.close()
+                        break
                     if type(d) != dict:
                         yield d
                 else:
@@ -260,6 +402,118 @@ class _Response:
             print("[WARN] EasyWeb: Unsupported data type.")
 
 
+class _RawResponse:
+    """
+    已经序列化的完整响应（状态行，响应头与响应体），发送时只需写入一次
+    """
+    __slots__ = ('status_code', 'data')
+
+    def __init__(self, data: bytes, status_code: int = 200):
+        self.data = data
+        self.status_code = status_code
+
+    def get_response(self, head: bool = False):
+        """
+        获取完整的 HTTP 响应生成器
+
+        Args:
+            head: 是否只生成响应头（HEAD 请求）
+
+        Returns:
+            只产生一次完整响应的生成器
+        """
+        if head:
+            yield self.data[:self.data.find(b"\r\n\r\n") + 4]
+        else:
+            yield self.data
+
+
+class _JsonStream:
+    """
+    流式 JSON 响应，由 stream_json() 创建：逐层遍历 dict, list 与生成器，分块编码并发送，不会生成完整的 JSON 字符串
+    """
+    __slots__ = ('data', 'chunk_size', 'status_code', 'headers')
+
+    def __init__(self, data, chunk_size: int = 512):
+        self.data = data
+        self.chunk_size = chunk_size
+        '每块的大致长度（字符）'
+        self.status_code = 200
+        self.headers = {'Content-Type': 'application/json'}
+
+    def get_response(self, head: bool = False):
+        """
+        获取完整的 HTTP 响应生成器
+
+        Args:
+            head: 是否只生成响应头（HEAD 请求）
+
+        Returns:
+            先产生响应头，再逐块产生 JSON 数据的生成器
+        """
+        yield ("HTTP/1.1 {} {}\r\n".format(self.status_code, _Response.STATUS_CODE.get(self.status_code, "NULL")) +
+               "".join(["{}: {}\r\n".format(k, v) for k, v in self.headers.items()]) + "\r\n").encode()
+        if head:
+            return
+        parts = []
+        size = 0
+        for s in _iter_json(self.data, self.chunk_size):
+            parts.append(s)
+            size += len(s)
+            if size >= self.chunk_size:
+                yield "".join(parts).encode()
+                parts = []
+                size = 0
+        if parts:
+            yield "".join(parts).encode()
+
+    def dumpable(self, head: bool = False):
+        """是否可以使用 json.dump() 直接写入连接：需要支持 io.IOBase，且数据中只有 json.dump() 可以编码的类型（没有生成器）"""
+        return not head and IOBase is not object and self._plain(self.data)
+
+    @classmethod
+    def _plain(cls, obj):
+        """数据中是否只有 dict（键为 str）, list, tuple, str, int, float, bool 与 None"""
+        if isinstance(obj, dict):
+            for k, v in obj.items():
+                if not isinstance(k, str) or not cls._plain(v):
+                    return False
+            return True
+        if isinstance(obj, (list, tuple)):
+            for v in obj:
+                if not cls._plain(v):
+                    return False
+            return True
+        return obj is None or isinstance(obj, (str, int, float, bool))
+
+
+class _ChunkWriter(IOBase):
+    """
+    分块缓冲 json.dump() 写入的数据，缓冲区满时通过 send 函数发送
+    """
+
+    def __init__(self, send, size: int = 512):
+        self.send = send
+        '发送数据的函数 send(bytes)'
+        self.size = size
+        '缓冲区的大小（字节）'
+        self.buf = bytearray()
+
+    def write(self, data):
+        if isinstance(data, str):  # CPython 写入 str，MicroPython 写入 bytes
+            data = data.encode()
+        self.buf.extend(data)
+        if len(self.buf) >= self.size:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        """发送缓冲区中的数据"""
+        if self.buf:
+            self.send(bytes(self.buf))
+            self.buf = bytearray()
+
+
 class _Request:
     """
     表示 HTTP 请求的类
@@ -282,21 +536,29 @@ class _Request:
     Note:
         在解析数据时，如果出现异常，则返回 None。
     """
+    # MicroPython 会忽略 __slots__，在支持的环境中可以使用固定的属性布局以减少内存占用
+    __slots__ = ('_url', '_args', '_form', '_json', '_cookies', 'path', 'data', 'method', 'headers', 'protocol',
+                 'full_path', 'match')
 
     def __init__(self):
+        self.headers: dict = {}
+        '请求头 (字典)'
+        self._reset()
+
+    def _reset(self):
+        """重置请求对象，以便从对象池中复用"""
         self._url = None
         self._args = None
         self._form = None
         self._json = None
-        self._cookies = {}
+        self._cookies = None
         self.path: str = ''
         '请求路径'
         self.data: bytes = b''
         '请求体'
         self.method: str = ""
         '请求方法，例如 GET, POST'
-        self.headers: dict = {}
-        '请求头 (字典)'
+        self.headers.clear()
         self.protocol: str = ""
         'HTTP 协议版本'
         self.full_path: str = ""
@@ -443,11 +705,393 @@ class _HttpError(Exception):
     pass
 
 
+class _Reader:
+    """
+    带缓冲区的请求读取器，每次读取的数据量不会超过调用者给出的限制
+    """
+
+    def __init__(self, conn=None):
+        self.conn = conn
+        self.buf = b''
+        '最近一次接收的数据'
+        self.pos = 0
+        '缓冲区中下一个未读取字节的位置'
+        self.deadline = None
+        self.nbytes = 0
+        '已接收的字节数'
+        self.capture = None
+        '录制的原始数据片段，为 None 时不录制'
+
+    def _reset(self):
+        """重置读取器，以便从对象池中复用"""
+        self.conn = None
+        self.buf = b''
+        self.pos = 0
+        self.deadline = None
+        self.nbytes = 0
+        self.capture = None
+
+    def set_timeout(self, timeout):
+        """
+        设置当前阶段的读取时限
+
+        Args:
+            timeout: 从现在开始计算的时限（秒），为 None 时不限制
+        """
+        if timeout is None:
+            self.deadline = None
+        else:
+            self.deadline = ticks_add(ticks_ms(), int(timeout * 1000))
+
+    def _recv(self, size: int):
+        """在时限内接收数据并计数"""
+        if self.deadline is not None:
+            t = ticks_diff(self.deadline, ticks_ms())
+            if t <= 0:
+                raise OSError("[ERROR] EasyWeb: Read timeout")
+            self.conn.settimeout(t / 1000)
+        data = self.conn.recv(size)
+        self.nbytes += len(data)
+        if self.capture is not None and data:
+            self.capture.append(data)
+        return data
+
+    def wait(self, size: int):
+        """
+        等待客户端发送数据，缓冲区中已有数据时立即返回
+
+        Args:
+            size: 本次最多读取的长度（字节）
+        """
+        if self.pos >= len(self.buf):
+            self.buf = self._recv(size)
+            self.pos = 0
+
+    def pending(self):
+        """缓冲区中已接收但尚未读取的数据"""
+        return self.buf[self.pos:]
+
+    def readline(self, limit: int):
+        """
+        读取一行数据
+
+        Args:
+            limit: 允许的最大长度（字节）
+
+        Returns:
+            bytes: 读取到的行；超出长度限制时返回 limit + 1 字节的数据，连接关闭时返回剩余的数据
+        """
+        while True:
+            pos = self.pos
+            i = self.buf.find(b"\n", pos, pos + limit + 1)
+            if i >= 0:  # 只移动读取位置，不复制缓冲区中剩余的数据
+                self.pos = i + 1
+                return self.buf[pos:i + 1]
+            n = len(self.buf) - pos  # 缓冲区中不完整的行
+            if n > limit:  # 超出长度限制，不再继续读取
+                return self.buf[pos:pos + limit + 1]
+            data = self._recv(limit + 1 - n)
+            if not data:
+                self.pos = len(self.buf)
+                return self.buf[pos:]
+            self.buf = self.buf[pos:] + data if n else data  # 只有一行被分成多次接收时才需要拼接
+            self.pos = 0
+
+    def read(self, size: int):
+        """
+        读取指定长度的数据
+
+        Args:
+            size: 需要读取的长度（字节）
+
+        Returns:
+            bytes: 读取到的数据，连接关闭时可能不足 size 字节
+        """
+        data = self.buf[self.pos:self.pos + size]
+        self.pos += len(data)
+        if len(data) < size:
+            parts = [data]
+            size -= len(data)
+            while size:
+                data = self._recv(size)
+                if not data:
+                    break
+                parts.append(data)
+                size -= len(data)
+            data = b''.join(parts)
+        return data
+
+
+class _Static:
+    """
+    静态文件目录：挂载时为目录中的全部文件建立索引，请求时查找字典即可发送文件
+
+    索引的每一项为 相对路径 -> (文件大小, 修改时间, MIME 类型, gzip 文件大小)；
+    存在同名的 ".gz" 文件时，向支持 gzip 的客户端发送压缩后的文件，文件大小为 None 表示只有 ".gz" 文件
+    """
+
+    def __init__(self, prefix: str, directory: str, check: bool = False):
+        self.prefix = prefix.rstrip('/')
+        '挂载的路径前缀'
+        self.base = self.prefix + '/'
+        self.directory = directory.rstrip('/')
+        '文件所在的目录'
+        self.check = check
+        '每次请求时是否检查文件的修改时间（使用文件元数据缓存）'
+        self.row = 0
+        '对应的路由序号'
+        self.files = {}
+        '文件索引'
+        self.refresh()
+
+    def refresh(self):
+        """重新扫描目录并建立索引，目录中的文件增加或删除后调用"""
+        files = {}
+        self._scan('', files)
+        for name, entry in list(files.items()):
+            if name[-3:] == '.gz':  # gzip 文件
+                base = files.get(name[:-3])
+                if base is None:
+                    files[name[:-3]] = (None, entry[1], _guess_type(name[:-3]), entry[0])
+                else:
+                    files[name[:-3]] = (base[0], base[1], base[2], entry[0])
+        self.files = files
+
+    def _scan(self, path: str, files: dict):
+        """递归扫描目录"""
+        for name in os.listdir(self.directory + path or '/'):
+            file = path + '/' + name
+            stat = os.stat(self.directory + file)
+            if stat[0] & 0x4000:  # 目录
+                self._scan(file, files)
+            else:
+                files[file[1:]] = (stat[6], stat[8], _guess_type(name), None)
+
+    def lookup(self, path: str):
+        """
+        查找文件
+
+        Args:
+            path: 相对于目录的路径（已解码）
+
+        Returns:
+            tuple / None: 索引项，文件不存在时为 None
+        """
+        entry = self.files.get(path)
+        if entry is None or not self.check:
+            return entry
+        file = self.directory + '/' + path
+        info = stat_cache.stat(file + '.gz' if entry[0] is None else file)
+        if info is None:  # 文件已被删除
+            self.files.pop(path, None)
+            return None
+        if info[1] != entry[1]:  # 文件已被修改
+            if entry[0] is None:
+                entry = (None, info[1], entry[2], info[0])
+            else:
+                gz = entry[3]
+                if gz is not None:
+                    gz = stat_cache.stat(file + '.gz')
+                    gz = gz and gz[0]
+                entry = (info[0], info[1], entry[2], gz)
+            self.files[path] = entry
+        return entry
+
+    def send(self, request):
+        """路由处理函数：发送 request.match 对应的文件"""
+        entry = self.files.get(request.match)
+        if entry is None:
+            return '<h2>Error 404: Page not found.</h2>', 404
+        size, mtime, mimetype, gz = entry
+        file = self.directory + '/' + request.match
+        head = {'Content-Type': mimetype}
+        if gz is not None:
+            head['Vary'] = 'Accept-Encoding'
+            if size is None or 'gzip' in request.headers.get('Accept-Encoding', ''):
+                file += '.gz'
+                size = gz
+                head['Content-Encoding'] = 'gzip'
+        if file_cache is not None:
+            response = file_cache.get(file, head)
+            if response is not None:
+                return response
+        return _stream_file(file, head)
+
+
+class _FileCache:
+    """
+    小文件 LRU 缓存：将较小的文件连同响应头序列化后保存在内存中，命中时只需写入一次，文件修改后自动失效
+
+    每一项为 路径 -> [修改时间, 完整响应, 最后使用的序号]
+    """
+
+    def __init__(self, budget: int = 16384, max_size: int = 4096, lock=None):
+        self.budget = budget
+        '缓存占用的最大内存（字节）'
+        self.max_size = max_size
+        '可以缓存的最大文件长度（字节）'
+        self.lock = _thread.allocate_lock() if lock is None else lock
+        '缓存的锁，由 enable_file_cache() 创建时与 EasyWeb 共用；多个处理请求的线程会同时读写缓存，不在锁内读取文件'
+        self.used = 0
+        '缓存已占用的内存（字节）'
+        self.entries = {}
+        self.tick = 0
+        self.hits = 0
+        '命中次数'
+        self.misses = 0
+        '未命中次数'
+
+    def get(self, file: str, head: dict):
+        """
+        获取文件的完整响应，未缓存时读取文件并加入缓存
+
+        Args:
+            file: 文件路径
+            head: 响应头，不需要包含 Content-Length
+
+        Returns:
+            _RawResponse / None: 文件不存在或超出 max_size 时为 None
+        """
+        info = stat_cache.stat(file)
+        if info is None or info[0] > self.max_size:
+            return None
+        with self.lock:
+            self.tick += 1
+            entry = self.entries.get(file)
+            if entry is not None:
+                if entry[0] == info[1]:
+                    entry[2] = self.tick
+                    self.hits += 1
+                    return _RawResponse(entry[1])
+                self._remove(file)  # 文件已被修改
+            self.misses += 1
+        with open(file, 'rb') as f:
+            body = f.read()
+        head['Content-Length'] = len(body)
+        data = ("HTTP/1.1 200 OK\r\n" + "".join(["{}: {}\r\n".format(k, v) for k, v in head.items()]) +
+                "\r\n").encode() + body
+        if len(data) <= self.budget:
+            with self.lock:
+                self._remove(file)  # 其他线程可能已经缓存了该文件
+                while self.used + len(data) > self.budget and self.entries:  # 移除最久未使用的文件
+                    oldest = None
+                    for k, v in self.entries.items():
+                        if oldest is None or v[2] < oldest[1]:
+                            oldest = (k, v[2])
+                    self._remove(oldest[0])
+                self.entries[file] = [info[1], data, self.tick]
+                self.used += len(data)
+        return _RawResponse(data)
+
+    def invalidate(self, file: str = None):
+        """
+        移除缓存的文件
+
+        Args:
+            file: 文件路径，为 None 时清空全部缓存
+        """
+        with self.lock:
+            if file is None:
+                self.entries.clear()
+                self.used = 0
+            else:
+                self._remove(file)
+
+    def _remove(self, file: str):
+        """移除缓存的文件，调用时需要持有锁"""
+        entry = self.entries.pop(file, None)
+        if entry is not None:
+            self.used -= len(entry[1])
+
+
+class _ResponseCache:
+    """
+    动态路由的响应缓存：保存序列化后的完整响应，过期或超出数量限制时移除
+
+    每一项为 键 -> [过期时间, 完整响应, 状态码, 最后使用的序号]
+    """
+
+    def __init__(self, ttl: float = 5, size: int = 8, lock=None):
+        self.ttl = ttl
+        '缓存的有效时间（秒）'
+        self.size = size
+        '最多缓存的响应数量'
+        self.lock = _thread.allocate_lock() if lock is None else lock
+        '缓存的锁，由 cache() 创建时与 EasyWeb 共用；多个处理请求的线程会同时读写缓存'
+        self.entries = {}
+        self.tick = 0
+        self.hits = 0
+        '命中次数'
+        self.misses = 0
+        '未命中次数'
+
+    def get(self, key: str):
+        """
+        获取缓存的响应
+
+        Returns:
+            _RawResponse / None: 未缓存或已过期时为 None
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if ticks_diff(entry[0], ticks_ms()) > 0:
+                    self.tick += 1
+                    entry[3] = self.tick
+                    self.hits += 1
+                    return _RawResponse(entry[1], entry[2])
+                del self.entries[key]
+            self.misses += 1
+        return None
+
+    def put(self, key: str, data: bytes, status_code: int):
+        """添加一个响应，超出数量限制时移除已过期或最久未使用的响应"""
+        with self.lock:
+            now = ticks_ms()
+            if key not in self.entries and len(self.entries) >= self.size:
+                oldest = None
+                for k, v in self.entries.items():
+                    if ticks_diff(v[0], now) <= 0:  # 已过期
+                        oldest = (k, -1)
+                        break
+                    if oldest is None or v[3] < oldest[1]:
+                        oldest = (k, v[3])
+                del self.entries[oldest[0]]
+            self.tick += 1
+            self.entries[key] = [ticks_add(now, int(self.ttl * 1000)), data, status_code, self.tick]
+
+    def clear(self):
+        """清空缓存"""
+        with self.lock:
+            self.entries.clear()
+
+
+class _Flight:
+    """
+    正在执行的路由处理函数（single-flight），相同的并发请求等待其结果
+    """
+    __slots__ = ('lock', 'result', 'error')
+
+    def __init__(self):
+        self.lock = _thread.allocate_lock()
+        self.lock.acquire()  # 执行完成后释放
+        self.result = None
+        self.error = None
+
+
 class EasyWeb:
     # HTTP 响应代码
     CODE_200 = b"HTTP/1.1 200 OK\r\n"
+    CODE_400 = b"HTTP/1.1 400 Bad Request\r\nContent-Type: text/html\r\n\r\n<h2>Error 400: Bad request.</h2>"
     CODE_404 = b"HTTP/1.1 404 Not Found\r\nContent-Type: text/html\r\n\r\n<h2>Error 404: Page not found.</h2>"
     CODE_405 = b"HTTP/1.1 405 Method Not Allowed\r\nContent-Type: text/html\r\n\r\n<h2>Error 405: Method not allowed.</h2>"
+    CODE_413 = b"HTTP/1.1 413 Payload Too Large\r\nContent-Type: text/html\r\n\r\n<h2>Error 413: Payload too large.</h2>"
+    CODE_414 = b"HTTP/1.1 414 URI Too Long\r\nContent-Type: text/html\r\n\r\n<h2>Error 414: URI too long.</h2>"
+    CODE_431 = b"HTTP/1.1 431 Request Header Fields Too Large\r\nContent-Type: text/html\r\n\r\n<h2>Error 431: Request header fields too large.</h2>"
+    CODE_503 = b"HTTP/1.1 503 Service Unavailable\r\nRetry-After: 1\r\nContent-Type: text/html\r\n\r\n<h2>Error 503: Service unavailable.</h2>"
+    CODE_505 = b"HTTP/1.1 505 HTTP Version Not Supported\r\nContent-Type: text/html\r\n\r\n<h2>Error 505: HTTP version not supported.</h2>"
+    ERRORS = {400: CODE_400, 413: CODE_413, 414: CODE_414, 431: CODE_431, 503: CODE_503, 505: CODE_505}
+    '_HttpError 状态码对应的响应'
 
     def __init__(self):
         self.host = str
@@ -456,8 +1100,62 @@ class EasyWeb:
         '监听的端口'
         self.routes = []
         '路由表'
+        self.mounts = []
+        '静态文件目录（_Static）'
+        self.caches = {}
+        '路由处理函数与其响应缓存（_ResponseCache），由 cache() 装饰器添加'
         self.server = None
         '服务器实例'
+        self.max_line = 1024
+        '请求行的最大长度（字节），超出时返回 414'
+        self.max_header_size = 4096
+        '请求头的最大总长度（字节），超出时返回 431'
+        self.max_headers = 32
+        '请求头的最大数量，超出时返回 431'
+        self.max_body = 16384
+        '请求体的最大长度（字节），Content-Length 超出时返回 413'
+        self.idle_timeout = 5
+        '建立连接后等待客户端发送请求的时限（秒）'
+        self.line_timeout = 5
+        '读取请求行的时限（秒）'
+        self.header_timeout = 5
+        '读取全部请求头的时限（秒）'
+        self.body_timeout = 10
+        '读取请求体的时限（秒）'
+        self.write_timeout = 10
+        '每次发送响应数据的时限（秒）'
+        self.max_conns = 4
+        '最大并发连接数，超出时直接返回 503 并关闭连接'
+        self.conns = 0
+        '当前正在处理的连接数'
+        self.conns_peak = 0
+        '并发连接数的峰值'
+        self.conns_rejected = 0
+        '因超出并发连接数而被拒绝的连接数'
+        self.mem_reserve = 8192
+        '接收请求体后仍需保留的空闲内存（字节）'
+        self.reserved = 0
+        '已经允许接收、尚未读取完成的请求体长度（字节），判断空闲内存时从中减去'
+        self.mem_wait = 2
+        '空闲内存不足时，等待其他请求释放内存的时限（秒），超时后返回 503'
+        self.pool_size = 4
+        '对象池中最多保留的请求与响应对象数量'
+        self._requests = []
+        '请求对象与读取器的对象池'
+        self._responses = []
+        '响应对象的对象池'
+        self.metrics = None
+        '按路由的请求统计（_Metrics），调用 enable_metrics() 后启用'
+        self.profiler = None
+        '分阶段耗时统计（_Profiler），调用 enable_profiling() 后启用，设为 None 时停用'
+        self.access_log = None
+        '访问日志（_AccessLog），调用 enable_access_log() 后启用'
+        self.capture = None
+        '请求录制（_Capture），调用 enable_capture() 后启用'
+        self.cors = None
+        '跨域资源共享的设置 (origin, headers, max_age)，调用 enable_cors() 后启用'
+        self._lock = _thread.allocate_lock()
+        '连接计数锁'
 
     def route(self, path: str, methods: list = None):
         """
@@ -473,18 +1171,170 @@ class EasyWeb:
                 return "Hello, World!"
 
         Notes:
-            另外支持使用 "/<string>" 和 ”/<path>“ 对末尾的字符串或者路径进行匹配，可以通过 request.match 获取匹配的结果
+            另外支持使用 "/<string>" 和 ”/<path>“ 对末尾的字符串或者路径进行匹配，可以通过 request.match 获取匹配的结果；
+            同一路径可以多次添加，分别处理不同的请求方法；允许 GET 时自动支持 HEAD，未处理 OPTIONS 时自动响应；
+            请求对象会在连接关闭后回收复用，处理函数返回后不能继续持有 request（例如保存到全局变量或交给其他线程），
+            需要时请先复制所需的数据；返回事件流或 WebSocket 时不会回收
         """
         # 添加路由装饰器
         if methods is None:
             methods = ['POST', 'GET']
 
         def decorator(func):
-            self.routes.append((path, func, methods))
+            for node in self.routes:  # 同一路径的不同请求方法共用一个路由
+                if node[0] == path:
+                    break
+            else:
+                node = [path, {}, None, None]
+                self.routes.append(node)
+                if self.metrics is not None:
+                    self.metrics.add(path)
+            for method in methods:
+                node[1][method] = func
+            self._update_route(node)
             return func
 
         return decorator
 
+    def _update_route(self, node: list):
+        """
+        根据路由允许的请求方法，预先生成 405 响应与 OPTIONS（CORS 预检）响应
+
+        Args:
+            node: 路由 [path, {method: func}, 405 响应, OPTIONS 响应]
+        """
+        methods = sorted(node[1])
+        if 'GET' in node[1] and 'HEAD' not in node[1]:
+            methods.append('HEAD')
+        if 'OPTIONS' not in node[1]:
+            methods.append('OPTIONS')
+        allow = ', '.join(methods)
+        node[2] = ("HTTP/1.1 405 Method Not Allowed\r\nAllow: {}\r\nContent-Type: text/html\r\n\r\n"
+                   "<h2>Error 405: Method not allowed.</h2>").format(allow).encode()
+        options = "HTTP/1.1 204 No Content\r\nAllow: {}\r\n".format(allow)
+        if self.cors is not None:
+            options += ("Access-Control-Allow-Origin: {}\r\nAccess-Control-Allow-Methods: {}\r\n"
+                        "Access-Control-Allow-Headers: {}\r\nAccess-Control-Max-Age: {}\r\n").format(
+                self.cors[0], allow, self.cors[1], self.cors[2])
+        node[3] = (options + "\r\n").encode()
+
+    def enable_cors(self, origin: str = '*', headers: str = 'Content-Type', max_age: int = 600):
+        """
+        启用跨域资源共享（CORS）：自动响应预检请求，并在响应中添加 Access-Control-Allow-Origin
+
+        Args:
+            origin: 允许的来源，例如 "http://192.168.4.2:8080"，默认为全部
+            headers: 允许的请求头
+            max_age: 浏览器缓存预检结果的时间（秒）
+        """
+        self.cors = (origin, headers, max_age)
+        for node in self.routes:
+            self._update_route(node)
+
+    def _cors(self, response):
+        """为响应添加 Access-Control-Allow-Origin 响应头"""
+        try:
+            response.headers['Access-Control-Allow-Origin'] = self.cors[0]
+            return response
+        except AttributeError:  # 已序列化的响应
+            i = response.data.find(b"\r\n") + 2
+            return _RawResponse(response.data[:i] + "Access-Control-Allow-Origin: {}\r\n".format(
+                self.cors[0]).encode() + response.data[i:], response.status_code)
+
+    def cache(self, ttl: float = 5, key=None, size: int = 8):
+        """
+        用于缓存路由响应的装饰器，在有效时间内直接发送序列化后的响应，不再调用路由处理函数
+
+        Args:
+            ttl: 缓存的有效时间（秒）
+            key: 区分缓存的请求参数名称列表，例如 ['room']；也可以为函数 key(request) -> str；
+                为 None 时只按请求路径区分
+            size: 最多缓存的响应数量
+
+        Example:
+            @app.route("/sensors")
+            @app.cache(ttl=5, key=['room'])
+            def sensors(request):
+                return read_sensors(request.args)
+
+        Note:
+            只缓存 GET 与 HEAD 请求状态码为 200 的响应，其他请求方法每次都会调用路由处理函数；
+            完整的响应会保存在内存中，请勿用于较大的响应或设置了 Cookies 的响应；
+            可以通过 app.caches[被装饰的函数] 获取缓存（_ResponseCache），例如调用 clear() 使其失效
+        """
+
+        def decorator(func):
+            store = _ResponseCache(ttl, size, self._lock)  # 没有 GIL 的移植版本（例如 rp2）中，多个线程可能同时修改缓存
+
+            def wrapper(request):
+                if request.method != 'GET' and request.method != 'HEAD':  # 只缓存 GET 与 HEAD 请求
+                    return func(request)
+                k = _request_key(request, key)
+                cached = store.get(k)
+                if cached is not None:
+                    return cached
+                response = self._serialize(func(request))
+                if response.status_code == 200:
+                    store.put(k, response.data, 200)
+                return response
+
+            self.caches[wrapper] = store
+            return wrapper
+
+        return decorator
+
+    def coalesce(self, key=None):
+        """
+        合并相同的并发请求（single-flight）的装饰器：相同的 GET 请求正在处理时，后到的请求等待其完成并共享同一个响应，
+        避免重复读取传感器等耗时的操作
+
+        Args:
+            key: 区分请求的参数名称列表，或者函数 key(request) -> str；为 None 时按请求的路径与参数区分
+
+        Example:
+            @app.route("/status")
+            @app.coalesce()
+            def status(request):
+                return read_sensors()
+
+        Note:
+            完整的响应会保存在内存中，请勿用于较大的响应
+        """
+
+        def decorator(func):
+            flights = {}
+
+            def wrapper(request):
+                if request.method != 'GET':
+                    return func(request)
+                k = request.full_path if key is None else _request_key(request, key)
+                with self._lock:
+                    flight = flights.get(k)
+                    leader = flight is None
+                    if leader:
+                        flight = _Flight()
+                        flights[k] = flight
+                if not leader:  # 等待正在执行的请求完成
+                    flight.lock.acquire()
+                    flight.lock.release()
+                    if flight.error is not None:
+                        raise flight.error
+                    return flight.result
+                try:
+                    flight.result = self._serialize(func(request))
+                    return flight.result
+                except Exception as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del flights[k]
+                    flight.lock.release()
+
+            return wrapper
+
+        return decorator
+
     def run(self, host="0.0.0.0", port=80):
         """
         运行 Web 服务器
@@ -505,8 +1355,420 @@ class EasyWeb:
         s.listen(5)
         # 循环处理连接
         while self.server:
-            conn, addr = s.accept()
-            _thread.start_new_thread(self.handle, (conn,))
+            self._idle()
+            s.settimeout(self.access_log.wait_time() if self.access_log is not None else None)
+            try:
+                conn, addr = s.accept()
+            except OSError:  # 等待超时，按时写入访问日志
+                continue
+            with self._lock:
+                admitted = self.conns < self.max_conns
+                if admitted:
+                    self.conns += 1
+                    if self.conns > self.conns_peak:
+                        self.conns_peak = self.conns
+            if admitted:
+                try:
+                    _thread.start_new_thread(self.handle, (conn,))
+                    continue
+                except (OSError, MemoryError, RuntimeError):  # 无法创建更多线程
+                    with self._lock:
+                        self.conns -= 1
+            self._reject(conn)
+
+    def _idle(self):
+        """等待新连接前的空闲时间，用于执行后台任务（批量写入访问日志）"""
+        if self.access_log is not None and self.access_log.pending():
+            with self._lock:  # 只在锁内复制记录，写入 Flash 时不阻塞请求线程
+                text, count = self.access_log.collect()
+            try:
+                self.access_log.write(text, count)
+            except OSError as e:
+                print("[WARN] EasyWEB: Access log - {}".format(e))
+
+    def _reject(self, conn):
+        """超出最大并发连接数时，快速返回 503 并关闭连接"""
+        self.conns_rejected += 1
+        try:
+            conn.settimeout(1)
+            conn.sendall(self.CODE_503)
+        except OSError:
+            pass
+        conn.close()
+
+    def hub(self, queue_size: int = 8):
+        """
+        创建发布/订阅中心，用于向多个事件流或 WebSocket 连接广播消息
+
+        Args:
+            queue_size: 每个订阅者最多积压的消息数量，超出时移除该订阅者（事件流结束，WebSocket 连接以 1008 关闭）
+
+        Returns:
+            _Hub: 发布/订阅中心
+
+        Example:
+            hub = app.hub()
+
+            @app.route("/events")
+            def events(request):
+                return event_stream(hub.subscribe())
+
+            hub.publish({'temperature': 23.5})
+
+        Note:
+            需要 easyweb_thread_hub 模块
+        """
+        return _import('easyweb_thread_hub')._Hub(queue_size)
+
+    def static(self, prefix: str = '/static', directory: str = '/web', check: bool = False):
+        """
+        挂载静态文件目录，在挂载时为目录中的文件建立索引，请求时通过查找索引发送文件，无需逐个添加路由
+
+        Args:
+            prefix: 路径前缀，例如 "/static"，请求 "/static/css/main.css" 时发送 "<directory>/css/main.css"
+            directory: 文件所在的目录
+            check: 每次请求时是否检查文件的修改时间（结果会在 stat_cache 中缓存 stat_cache.ttl 毫秒）；
+                目录中增加或删除文件后，需要调用返回值的 refresh()
+
+        Returns:
+            _Static: 静态文件目录
+
+        Note:
+            只会发送索引中的文件，请求路径中的 "../" 等无法访问目录以外的文件；
+            存在同名的 ".gz" 文件时，向支持 gzip 的客户端发送压缩后的文件
+        """
+        mount = _Static(prefix, directory, check)
+        self.route(mount.base + '<path>', ['GET'])(mount.send)
+        mount.row = [node[0] for node in self.routes].index(mount.base + '<path>') + 1
+        self.mounts.append(mount)
+        return mount
+
+    def enable_file_cache(self, budget: int = 16384, max_size: int = 4096):
+        """
+        启用小文件缓存，send_file() 与静态文件目录发送的小文件会连同响应头保存在内存中
+
+        Args:
+            budget: 缓存占用的最大内存（字节）
+            max_size: 可以缓存的最大文件长度（字节）
+
+        Returns:
+            _FileCache: 小文件缓存，也可以调用 invalidate() 主动移除文件
+
+        Note:
+            文件的修改时间通过 stat_cache 检查，修改文件后最多 stat_cache.ttl 毫秒内仍可能发送旧的内容
+        """
+        global file_cache
+        file_cache = _FileCache(budget, max_size, self._lock)
+        return file_cache
+
+    def enable_metrics(self, path: str = '/metrics'):
+        """
+        启用按路由的请求统计（请求数，状态码，收发字节数，耗时直方图）
+
+        Args:
+            path: 查看统计数据的路由路径，默认为 "/metrics"，为 None 时不添加路由；
+                默认输出 Prometheus 文本格式，添加参数 ?format=json 时输出 JSON
+
+        Returns:
+            _Metrics: 统计数据
+
+        Note:
+            需要 easyweb_metrics 模块（与本模块放在同一目录中）
+        """
+        if self.metrics is None:
+            self.metrics = _import('easyweb_metrics')._Metrics()
+            for route in self.routes:
+                self.metrics.add(route[0])
+        if path:
+            self.route(path, ['GET'])(self._metrics_page)
+        return self.metrics
+
+    def enable_profiling(self, hook=None, slow_ms: int = 100, size: int = 8):
+        """
+        启用请求处理流程的分阶段耗时统计（解析请求，匹配路由，读取请求体，处理函数，生成响应，发送响应）
+
+        Args:
+            hook: 每个请求完成后调用的函数 hook(request, timings)，timings 为 {阶段: 耗时（微秒）}
+            slow_ms: 慢请求的阈值（毫秒），总耗时超出时记录到慢请求缓冲区
+            size: 慢请求缓冲区的大小
+
+        Returns:
+            _Profiler: 可以通过 slow_requests() 获取最近的慢请求
+
+        Note:
+            需要 easyweb_profiler 模块
+        """
+        self.profiler = _import('easyweb_profiler')._Profiler(hook, slow_ms, size)
+        return self.profiler
+
+    def enable_access_log(self, size: int = 64, file: str = None, max_size: int = 16384, batch: int = 32,
+                          interval: int = 60, path: str = '/access_log'):
+        """
+        启用保存在内存中的访问日志，并可以批量写入文件（在等待新连接时检查并写入，没有新连接时也会按 interval 写入）
+
+        Args:
+            size: 内存中最多保存的记录数量
+            file: 日志文件的路径，为 None 时只保存在内存中
+            max_size: 日志文件的最大长度（字节），超出时将其重命名为 "<file>.1"
+            batch: 积累的记录数量达到该值时写入文件
+            interval: 距离上次写入超过该时间（秒）时写入文件
+            path: 查看日志的路由路径，为 None 时不添加路由
+
+        Returns:
+            _AccessLog: 访问日志，也可以调用 flush() 主动写入文件
+
+        Note:
+            需要 easyweb_access_log 模块
+        """
+        self.access_log = _import('easyweb_access_log')._AccessLog(size, file, max_size, batch, interval)
+        if path:
+            self.route(path, ['GET'])(lambda request: self.access_log.page())
+        return self.access_log
+
+    def enable_capture(self, file: str = '/capture.bin', max_size: int = 65536):
+        """
+        启用请求录制，将每个请求的原始数据与到达时间写入文件，用于使用 tools/replay.py 回放真实流量
+
+        Args:
+            file: 录制文件的路径，启用时会被清空
+            max_size: 录制文件的最大长度（字节），超出后不再录制
+
+        Returns:
+            _Capture: 请求录制器，设置 EasyWeb.capture = None 可以停止录制
+
+        Note:
+            每个请求都会写入一次文件，仅用于调试，请勿长期启用；需要 easyweb_capture 模块
+        """
+        self.capture = _import('easyweb_capture')._Capture(file, max_size)
+        return self.capture
+
+    def _metrics_page(self, request):
+        """统计数据页面"""
+        if request.args and request.args.get('format') == 'json':
+            return {'routes': self.metrics.json(),
+                    'connections': {'current': self.conns, 'peak': self.conns_peak, 'rejected': self.conns_rejected}}
+        return self._prometheus()
+
+    def _prometheus(self):
+        """以 Prometheus 文本格式输出统计数据与连接数"""
+        yield from self.metrics.prometheus()
+        yield '# TYPE easyweb_connections gauge\neasyweb_connections {}\n'.format(self.conns).encode()
+        yield '# TYPE easyweb_connections_peak gauge\neasyweb_connections_peak {}\n'.format(self.conns_peak).encode()
+        yield '# TYPE easyweb_connections_rejected_total counter\neasyweb_connections_rejected_total {}\n'.format(
+            self.conns_rejected).encode()
+
+    def _release(self, item, response=None):
+        """
+        将请求对象、读取器与响应对象回收到对象池
+
+        Args:
+            item: (请求对象, 读取器)，为 None 时不回收
+            response: 取自对象池的响应对象
+        """
+        if item is not None:
+            item[0]._reset()
+            item[1]._reset()
+        if response is not None:
+            response._reset()
+        with self._lock:  # 没有 GIL 的移植版本（例如 rp2）中，多个线程可能同时修改对象池
+            if item is not None and len(self._requests) < self.pool_size:
+                self._requests.append(item)
+            if response is not None and len(self._responses) < self.pool_size:
+                self._responses.append(response)
+
+    def _find_route(self, request):
+        """
+        查找与请求路径匹配的路由，并设置 request.match
+
+        Args:
+            request: 请求对象
+
+        Returns:
+            (int, list / None): 路由的序号（从 1 开始）与路由 [path, {method: func}, 405 响应, OPTIONS 响应]，未匹配时为 (0, None)
+        """
+        path = request.path.rstrip("/")
+        for mount in self.mounts:  # 静态文件目录，只需查找索引
+            if request.path.startswith(mount.base):
+                try:
+                    name = url_decode(request.path[len(mount.base):])
+                except ValueError:  # 错误的百分号编码（例如 %zz），不会是目录中的文件，按未找到处理
+                    continue
+                if mount.lookup(name) is not None:
+                    request.match = name
+                    return mount.row, self.routes[mount.row - 1]
+        for row, route in enumerate(self.routes, 1):
+            route_path = route[0]
+            # 匹配路由 "/" 和 "/<string>" "/<path>"
+            # 完全匹配
+            if route_path.rstrip("/") == path:
+                request.match = None
+                return row, route
+            # 匹配字符串
+            elif route_path[-9:] == "/<string>" and route_path[:-9] == "/".join(path.split("/")[:-1]):
+                request.match = request.path[len(route_path[:-9]) + 1:]
+                return row, route
+            # 匹配路径
+            elif (route_path[-7:] == "/<path>" and request.path.startswith(route_path[:-6]) and
+                  request.path[len(route_path[:-7]) + 1:]):
+                request.match = request.path[len(route_path[:-7]) + 1:]
+                return row, route
+        return 0, None
+
+    def _serialize(self, result):
+        """
+        将路由处理函数的返回值序列化为完整的响应
+
+        Returns:
+            _RawResponse: 已序列化的响应
+        """
+        response, pooled = self._to_response(result)
+        status_code = response.status_code
+        data = b''.join(response.get_response())
+        if pooled:
+            self._release(None, response)
+        return _RawResponse(data, status_code)
+
+    def _to_response(self, result):
+        """
+        将路由处理函数的返回值转换为响应对象
+
+        Args:
+            result: 路由处理函数的返回值，可以为 _Response, str, bytes, dict, generator 或
+                (以上类型, status_code, headers) 形式的元组
+
+        Returns:
+            (_Response, bool): 响应对象，以及该对象是否取自对象池（发送完成后需要回收）
+        """
+        try:
+            result.get_response
+            return result, False
+        except AttributeError:
+            pass
+        status_code = 200
+        headers = None
+        if isinstance(result, tuple):  # return response, status_code, headers
+            if len(result) >= 2:
+                status_code = result[1]
+            if len(result) == 3:
+                headers = result[2]
+            result = result[0]
+            try:
+                result.get_response
+                result.status_code = status_code
+                if headers:
+                    result.headers.update(headers)
+                return result, False
+            except AttributeError:
+                pass
+        # return bytes / str / iterables / tuple (bytes / str / iterables, status_code, headers)
+        with self._lock:
+            response = self._responses.pop() if self._responses else None
+        if response is None:
+            response = _Response()
+        response.status_code = status_code
+        response.data = result
+        if headers:
+            response.headers.update(headers)
+        return response, True
+
+    def _send_profiled(self, conn, response, profiler, times: list, head: bool = False):
+        """
+        发送响应，并分别记录生成响应内容与发送数据的耗时
+
+        Args:
+            profiler: 分阶段耗时统计
+            times: 各个阶段的耗时（微秒）
+            head: 是否只发送响应头（HEAD 请求）
+
+        Returns:
+            int: 已发送的字节数
+        """
+        sent = 0
+        t = ticks_us()
+        for res in response.get_response(head):
+            t = profiler.mark(times, 4, t)
+            self._write(conn, res)
+            t = profiler.mark(times, 5, t)
+            sent += len(res)
+        profiler.mark(times, 4, t)
+        return sent
+
+    def _reserve(self, size: int):
+        """
+        根据空闲内存与请求体的长度，判断现在是否可以接收请求体
+
+        空闲内存不足时先进行垃圾回收，仍然不足时等待其他请求释放内存，超出时限后返回 503；
+        允许接收时将 size 计入 reserved，调用者读取请求体完成或失败后需要减去
+
+        Args:
+            size: 请求体的长度（字节）
+        """
+        need = size + self.mem_reserve
+        deadline = None
+        while True:
+            with self._lock:  # 检查与登记需要同时完成，多个线程可能同时接收请求体
+                if mem_free() - self.reserved >= need:  # 已经允许接收、尚未读取完成的请求体还会占用内存
+                    self.reserved += size
+                    return
+            if deadline is None:  # 第一次检查不满足时先进行垃圾回收
+                if need > mem_free() + mem_alloc():  # 即使释放全部内存也无法满足
+                    raise _HttpError(size, 503, "Service Unavailable")
+                deadline = ticks_add(ticks_ms(), int(self.mem_wait * 1000))
+            elif ticks_diff(deadline, ticks_ms()) <= 0:
+                raise _HttpError(size, 503, "Service Unavailable")
+            else:
+                time.sleep(0.1)
+            gc.collect()
+
+    def _read_headers(self, stream, request):
+        """
+        读取并解析 HTTP 请求头
+
+        Args:
+            stream: 请求读取器
+            request: 请求对象
+        """
+        size = 0  # 已读取的请求头长度
+        while True:
+            raw = stream.readline(self.max_header_size - size)  # 请求头参数：\r\n
+            size += len(raw)
+            if size > self.max_header_size:
+                raise _HttpError(size, 431, "Request Header Fields Too Large")
+            raw = raw.decode('utf-8').rstrip('\r\n').split(": ", 1)
+            if len(raw) == 2:
+                if len(request.headers) >= self.max_headers:
+                    raise _HttpError(len(request.headers), 431, "Request Header Fields Too Large")
+                k, v = raw
+                request.headers[k] = v
+            elif len(raw) == 1:  # 请求头结束：\r\n\r\n
+                break
+            else:
+                pass
+
+    def _dump_json(self, conn, response):
+        """
+        发送流式 JSON 响应：使用 json.dump() 将数据经过分块缓冲直接写入连接
+
+        Returns:
+            int: 已发送的字节数
+        """
+        sent = [0]
+
+        def send(data):
+            self._write(conn, data)
+            sent[0] += len(data)
+
+        for head in response.get_response(True):
+            send(head)
+        writer = _ChunkWriter(send, response.chunk_size)
+        json.dump(response.data, writer)
+        writer.flush()
+        return sent[0]
+
+    def _write(self, conn, data):
+        """在时限内发送响应数据"""
+        conn.settimeout(self.write_timeout)
+        conn.sendall(data)
 
     def handle(self, conn):
         """
@@ -515,10 +1777,34 @@ class EasyWeb:
         Args:
             conn: 用于从客户端读取请求数据和发送响应的对象
         """
-        request = _Request()
-        conn.settimeout(5)
+        with self._lock:  # 从对象池中取出请求对象与读取器
+            item = self._requests.pop() if self._requests else None
+        if item is None:
+            item = (_Request(), _Reader())
+        request, stream = item
+        stream.conn = conn
+        if self.capture is not None:
+            stream.capture = []
+            arrival = ticks_diff(ticks_ms(), self.capture.start)
+        response = None
+        pooled = False
+        keep = False  # 处理函数可能在返回后仍在使用请求对象，不回收
+        start = ticks_us()
+        row = 0  # 统计数据所在的行
+        status = 0  # 已发送的状态码
+        sent = 0  # 已发送的字节数
+        times = None  # 各阶段的耗时，仅在启用性能分析时记录
         try:
-            raw = conn.readline()  # HTTP 请求方法，路径，协议版本
+            stream.set_timeout(self.idle_timeout)
+            stream.wait(self.max_line + 1)
+            profiler = self.profiler  # 处理请求的过程中可能被停用
+            if profiler is not None:
+                times = [0] * len(profiler.PHASES)
+                t = ticks_us()
+            stream.set_timeout(self.line_timeout)
+            raw = stream.readline(self.max_line)  # HTTP 请求方法，路径，协议版本
+            if len(raw) > self.max_line:
+                raise _HttpError(raw, 414, "URI Too Long")
             raw = raw.decode('utf-8').split(" ")
             if len(raw) != 3:
                 return
@@ -529,84 +1815,105 @@ class EasyWeb:
             if request.protocol not in ("HTTP/1.0", "HTTP/1.1"):
                 raise _HttpError(request.protocol, 505, "Version Not Supported")
             # 解析 HTTP 请求头
-            while True:
-                raw = conn.readline()  # 请求头参数：\r\n
-                raw = raw.decode('utf-8').rstrip('\r\n').split(": ", 1)
-                if len(raw) == 2:
-                    k, v = raw
-                    request.headers[k] = v
-                elif len(raw) == 1:  # 请求头结束：\r\n\r\n
-                    break
-                else:
-                    pass
+            stream.set_timeout(self.header_timeout)
+            self._read_headers(stream, request)
+            if times is not None:
+                t = profiler.mark(times, 0, t)
             # 查找匹配路由
-            for route_path, route_func, route_methods in self.routes:
-                # 匹配路由 "/" 和 "/<string>" "/<path>"
-                # 完全匹配
-                if route_path.rstrip("/") == request.path.rstrip("/"):
-                    request.match = None
-                    match_success = True
-                # 匹配字符串
-                elif route_path[-9:] == "/<string>" and route_path[:-9] == "/".join(
-                        request.path.rstrip("/").split("/")[:-1]):
-                    request.match = request.path[len(route_path[:-9]) + 1:]
-                    match_success = True
-                # 匹配路径
-                elif (route_path[-7:] == "/<path>" and
-                      "/".join(request.path.rstrip("/").split("/")[:-1]).startswith(route_path[:-7]) and
-                      request.path[len(route_path[:-7]) + 1:]):
-                    request.match = request.path[len(route_path[:-7]) + 1:]
-                    match_success = True
-                else:
-                    match_success = False
-                if match_success:  # 完全匹配，字符串匹配，路径匹配
-                    if request.method in route_methods:  # 匹配到路由
-                        # 获取请求体
+            row, route = self._find_route(request)
+            if times is not None:
+                t = profiler.mark(times, 1, t)
+            if route is None:
+                # 发送"页面不存在"响应
+                self._write(conn, self.CODE_404)
+                status = 404
+                sent = len(self.CODE_404)
+            else:
+                route_func = route[1].get(request.method)
+                head = False
+                if route_func is None and request.method == 'HEAD':  # GET 路由自动支持 HEAD 请求
+                    route_func = route[1].get('GET')
+                    head = True
+                if route_func is not None:  # 匹配到路由
+                    # 获取请求体
+                    try:
                         size = int(request.headers.get("Content-Length", 0))
-                        if size:
-                            request.data = conn.read(size)
-                        else:
-                            request.data = None
-                        # 调用路由处理函数并发送响应
-                        response = route_func(request)  # str / bytes / generator / None
+                    except ValueError:
+                        raise _HttpError(request.headers.get("Content-Length"), 400, "Bad Request")
+                    if size < 0:
+                        raise _HttpError(size, 400, "Bad Request")
+                    if size > self.max_body:  # 在读取请求体之前拒绝
+                        raise _HttpError(size, 413, "Payload Too Large")
+                    if size:
+                        self._reserve(size)
                         try:
-                            response.get_response
-                        except AttributeError:
-                            if isinstance(response, tuple):  # return response, status_code, headers
-                                try:
-                                    response[0].get_response
-                                    status_code = response[1]
-                                    if len(response) == 3:
-                                        headers = response[2]
-                                    else:
-                                        headers = None
-                                    response = response[0]
-                                    response.status_code = status_code
-                                    if headers:
-                                        response.headers.update(headers)
-                                except AttributeError:
-                                    if len(response) == 2:
-                                        response = make_response(response[0], response[1])
-                                    elif len(response) == 3:
-                                        response = make_response(response[0], response[1], response[2])
-                            else:  # return bytes / str / iterables / tuple (bytes / str / iterables, status_code, headersr)
-                                response = make_response(response)
-
-                        for res in response.get_response():
-                            conn.sendall(res)
+                            stream.set_timeout(self.body_timeout)
+                            request.data = stream.read(size)
+                        finally:
+                            with self._lock:
+                                self.reserved -= size
                     else:
-                        # 发送"方法不允许"响应
-                        conn.sendall(self.CODE_405)
-                    break
-            else:
-                # 发送"页面不存在"响应
-                conn.sendall(self.CODE_404)
+                        request.data = None
+                    if times is not None:
+                        t = profiler.mark(times, 2, t)
+                    # 调用路由处理函数并发送响应
+                    response, pooled = self._to_response(route_func(request))  # str / bytes / generator / None
+                    keep = hasattr(response, '_serve')  # 保持连接的响应（事件流，WebSocket）
+                    if keep and head:  # HEAD 请求只发送响应头：结束事件源，执行其中的清理代码
+                        response._end()
+                    if self.cors is not None:
+                        response = self._cors(response)
+                    if type(response) is _JsonStream and response.dumpable(head):
+                        sent = self._dump_json(conn, response)
+                    elif times is None:
+                        for res in response.get_response(head):
+                            self._write(conn, res)
+                            sent += len(res)
+                    else:
+                        profiler.mark(times, 3, t)
+                        sent = self._send_profiled(conn, response, profiler, times, head)
+                    status = response.status_code
+                    if keep and not head:  # 保持连接，发送事件或处理 WebSocket 帧
+                        sent += response._serve(self, conn, stream.pending())
+                elif request.method == 'OPTIONS':  # 预先生成的 OPTIONS（CORS 预检）响应
+                    self._write(conn, route[3])
+                    status = 204
+                    sent = len(route[3])
+                else:
+                    # 发送"方法不允许"响应
+                    self._write(conn, route[2])
+                    status = 405
+                    sent = len(route[2])
+        except _HttpError as e:  # 请求不符合要求，返回对应的错误响应
+            status = e.args[1]
+            try:
+                self._write(conn, self.ERRORS[status])
+                sent = len(self.ERRORS[status])
+            except OSError:  # 客户端已断开或重置连接
+                pass
         except OSError:
             pass
         except Exception as e:
             print("[WARN] EasyWEB: {}".format(e))
         finally:
+            if times is not None and status:
+                profiler.report(request, status, times)
+            if self.access_log is not None and status:
+                with self._lock:
+                    self.access_log.record(request.method, request.path, status, sent, ticks_diff(ticks_us(), start) // 1000)
+            if self.metrics is not None and status:
+                with self._lock:
+                    self.metrics.record(row, status, stream.nbytes, sent, ticks_diff(ticks_us(), start))
+            if stream.capture and self.capture is not None:
+                try:
+                    with self._lock:
+                        self.capture.record(arrival, stream.capture, status, ticks_diff(ticks_us(), start))
+                except OSError as e:
+                    print("[WARN] EasyWEB: Capture - {}".format(e))
+            self._release(None if keep else item, response if pooled else None)
             # 关闭连接
+            with self._lock:
+                self.conns -= 1
             conn.close()
 
     def stop(self):
@@ -618,6 +1925,38 @@ class EasyWeb:
             _thread.exit()
 
 
+def _guess_type(file):
+    """根据文件扩展名猜测 MIME 类型"""
+    e = file.split(".")
+    if len(e) >= 2:
+        return FILE_TYPE.get(e[-1], "application/octet-stream")
+    return "application/octet-stream"
+
+
+def _stream_file(file, head):
+    """
+    分块读取并发送文件
+
+    Content-Length 取自实际打开的文件，而不是可能已过期的 stat_cache 或静态文件索引，
+    发送的字节数不会超过该长度
+
+    Args:
+        file: 文件路径
+        head: 响应头
+    """
+    with open(file, "rb") as f:
+        size = f.seek(0, 2)
+        f.seek(0)
+        head['Content-Length'] = size
+        yield head
+        while size > 0:
+            _file = f.read(1024 if size > 1024 else size)
+            if not _file:  # 文件在发送过程中被截短
+                break
+            size -= len(_file)
+            yield _file
+
+
 def send_file(file, mimetype: str = None, as_attachment=False, attachment_filename=None):
     """
     发送文件给客户端
@@ -629,28 +1968,23 @@ def send_file(file, mimetype: str = None, as_attachment=False, attachment_filena
         attachment_filename: 下载文件时向用户显示的文件名。如果未提供，将使用原始文件名
 
     Returns:
-        包含 HTTP 200 OK 和 文件的二进制数据 的可迭代对象
+        包含 HTTP 200 OK 和 文件的二进制数据 的可迭代对象；启用小文件缓存且文件较小时为已序列化的响应
     """
     head = {'Content-Type': 'application/octet-stream'}
     if as_attachment:  # 作为附件发送文件
         if not attachment_filename:  # 下载文件时的文件名
             attachment_filename = file.split("/")[-1]
         head['Content-Disposition'] = 'attachment; filename="{}"'.format(attachment_filename)
-    else:
-        if mimetype is None:  # 自动识别文件的 MIME 类型
-            e = file.split(".")
-            if len(e) >= 2:
-                head['Content-Type'] = FILE_TYPE.get(e[-1], "application/octet-stream")
-    if not exists(file):
-        yield {'Content-Type': 'text/html'}
-        yield '<h2>File Not Exists: {}</h2>'.format(file).encode("utf-8")
-    else:
-        yield head
-        with open(file, "rb") as f:
-            _file = True
-            while _file:
-                _file = f.read(1024)
-                yield _file
+    elif mimetype is None:  # 自动识别文件的 MIME 类型
+        head['Content-Type'] = _guess_type(file)
+    info = stat_cache.stat(file)
+    if info is None:
+        return '<h2>File Not Exists: {}</h2>'.format(file)
+    if file_cache is not None and not as_attachment:
+        response = file_cache.get(file, head)
+        if response is not None:
+            return response
+    return _stream_file(file, head)
 
 
 def render_template(file, **kwargs):
@@ -678,6 +2012,150 @@ def render_template(file, **kwargs):
                 yield _file.encode("utf-8")
 
 
+def event_stream(source, heartbeat: float = 15, interval: float = 1, retry: int = None):
+    """
+    创建服务器推送事件（Server-Sent Events）响应，服务器会保持连接，直到事件源结束或客户端断开
+
+    Args:
+        source: 事件源（同步生成器）；产生 bytes 时视为已编码的事件（例如 sse_event() 的返回值）直接发送，
+            产生 str, dict, list 时作为事件数据编码后发送，暂时没有事件时应产生 None，服务器会在 interval 秒后再次轮询
+        heartbeat: 没有事件时发送心跳的间隔（秒）
+        interval: 事件源产生 None 后再次轮询的间隔（秒）
+        retry: 连接断开后浏览器重新连接的等待时间（毫秒）
+
+    Returns:
+        _EventStream: 事件流响应
+
+    Example:
+        @app.route("/events")
+        def events(request):
+            def source():
+                while True:
+                    time.sleep(1)
+                    yield {'temperature': read_temperature()}
+            return event_stream(source())
+
+    Note:
+        每个事件流占用一个线程与一个连接（max_conns）；需要 easyweb_thread_sse 模块
+    """
+    return _import('easyweb_thread_sse')._EventStream(source, heartbeat, interval, retry)
+
+
+def sse_event(data, event: str = None, id=None) -> bytes:
+    """
+    将数据编码为一个服务器推送事件
+
+    Args:
+        data: 事件数据，可以为 str, bytes 或可以序列化为 JSON 的 dict, list
+        event: 事件类型，浏览器中通过 addEventListener(event, ...) 接收，为 None 时为 message
+        id: 事件 ID，浏览器重新连接时会通过 Last-Event-ID 请求头发送最后收到的 ID
+
+    Returns:
+        bytes: 编码后的事件
+    """
+    if isinstance(data, bytes):
+        data = data.decode()
+    elif not isinstance(data, str):
+        data = json.dumps(data)
+    frame = ''
+    if event is not None:
+        frame += 'event: {}\n'.format(event)
+    if id is not None:
+        frame += 'id: {}\n'.format(id)
+    return (frame + 'data: ' + data.replace('\n', '\ndata: ') + '\n\n').encode()
+
+
+def websocket(request, on_message, on_open=None, on_close=None, max_size: int = 2048):
+    """
+    将请求升级为 WebSocket 连接（RFC 6455），服务器会保持连接，直到任意一方关闭连接
+
+    Args:
+        request: 请求对象
+        on_message: 收到完整消息时调用 on_message(ws, data)，文本消息为 str，二进制消息为 bytes
+        on_open: 连接建立后调用 on_open(ws)
+        on_close: 连接关闭后调用 on_close(ws, code)，code 为关闭代码，连接异常断开时为 1006
+        max_size: 消息（包括分片的消息）的最大长度（字节），超出时以 1009 关闭连接；每个连接会预先分配约两倍的内存
+
+    Returns:
+        _WebSocket: WebSocket 连接；请求不是 WebSocket 握手请求时为 400 响应
+
+    Example:
+        @app.route("/ws")
+        def ws(request):
+            def on_message(ws, data):
+                ws.send("echo: " + data)
+            return websocket(request, on_message)
+
+    Note:
+        每个连接占用一个线程；ws.send() 可以在其他线程中调用；需要 easyweb_thread_websocket 模块
+    """
+    key = request.headers.get('Sec-WebSocket-Key')
+    if request.method != 'GET' or key is None or request.headers.get('Upgrade', '').lower() != 'websocket':
+        return '<h2>Error 400: WebSocket upgrade required.</h2>', 400
+    return _import('easyweb_thread_websocket')._WebSocket(request, key, on_message, on_open, on_close, max_size)
+
+
+def stream_json(data, chunk_size: int = 512):
+    """
+    创建流式 JSON 响应：逐层遍历 dict, list, tuple 与生成器等可迭代对象，分块编码后发送，
+    内存占用与数据的总大小无关；直接返回 dict 时会先生成完整的 JSON 字符串与其 bytes 副本
+
+    Args:
+        data: 要编码的数据，其中的列表可以使用生成器代替，例如逐条读取的历史记录
+        chunk_size: 每块的大致长度（字符）
+
+    Returns:
+        _JsonStream: 流式 JSON 响应
+
+    Example:
+        @app.route("/history")
+        def history(request):
+            return stream_json({'points': (read_point(i) for i in range(2000))})
+
+    Note:
+        数据中没有生成器且固件支持 io.IOBase 时，使用 json.dump() 将数据分块直接写入连接
+    """
+    return _JsonStream(data, chunk_size)
+
+
+def _iter_json(obj, size: int):
+    """
+    逐个产生 obj 编码后的 JSON 片段（str），dict, list, tuple 与生成器等可迭代对象会逐层展开，超过 size 的字符串会被切分
+    """
+    if isinstance(obj, dict):
+        yield '{'
+        first = True
+        for k, v in obj.items():
+            yield (json.dumps(k if isinstance(k, str) else str(k)) if first else
+                   ', ' + json.dumps(k if isinstance(k, str) else str(k))) + ': '
+            first = False
+            yield from _iter_json(v, size)
+        yield '}'
+    elif obj is None or isinstance(obj, (str, int, float, bool)):
+        s = json.dumps(obj)
+        if len(s) <= size:
+            yield s
+        else:
+            for i in range(0, len(s), size):
+                yield s[i:i + size]
+    else:
+        try:
+            if isinstance(obj, (bytes, bytearray)):
+                raise TypeError
+            items = iter(obj)
+        except TypeError:  # 交给 json.dumps() 处理或报错
+            yield json.dumps(obj)
+            return
+        yield '['
+        first = True
+        for v in items:
+            if not first:
+                yield ', '
+            first = False
+            yield from _iter_json(v, size)
+        yield ']'
+
+
 def make_response(content=b'', status_code: int = 200, headers=None) -> _Response:
     """
     创建一个带有 内容、状态码 和 头部 的 响应对象。
@@ -0,0 +1,309 @@
+# Github: https://github.com/funnygeeker/micropython-easyweb
+# Author: funnygeeker
+# Licence: MIT
+#
+# EasyWeb（asyncio 版本）的可选模块：WebSocket 连接（RFC 6455），由 websocket() 导入
+import binascii
+import hashlib
+try:
+    import uasyncio as asyncio
+except ImportError:  # CPython
+    import asyncio
+try:
+    from .easyweb import _is_async, _drain
+except ImportError:  # easyweb 不在包中
+    from easyweb import _is_async, _drain
+
+
+class _WebSocket:
+    """
+    WebSocket 连接（RFC 6455），由 websocket() 创建：完成握手后增量解析客户端发送的帧，通过回调函数处理消息
+    """
+    GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+    OP_CONT = 0
+    OP_TEXT = 1
+    OP_BINARY = 2
+    OP_CLOSE = 8
+    OP_PING = 9
+    OP_PONG = 10
+    PING = 30
+    '没有收到数据时发送 ping 的间隔（秒），用于保持连接并检测已断开的客户端'
+
+    def __init__(self, request, key: str, on_message, on_open=None, on_close=None, max_size: int = 2048):
+        self.request = request
+        '建立连接的请求'
+        self.key = key
+        self.on_message = on_message
+        '收到完整消息时调用 on_message(ws, data)，文本消息为 str，二进制消息为 bytes'
+        self.on_open = on_open
+        '连接建立后调用 on_open(ws)'
+        self.on_close = on_close
+        '连接关闭后调用 on_close(ws, code)'
+        self.status_code = 101
+        self.headers = {}
+        self.buf = bytearray(max(max_size, 125) + 14)
+        '接收缓冲区，最多保存一个完整的帧，负载在其中就地解除掩码'
+        self.n = 0
+        '接收缓冲区中的字节数'
+        self.message = bytearray(max_size)
+        '消息缓冲区，用于拼接分片的消息'
+        self.size = 0
+        '消息缓冲区中的字节数'
+        self.opcode = 0
+        '正在接收的分片消息的类型'
+        self.closed = False
+        '是否已发送关闭帧'
+        self.io = None
+        '发送数据的连接'
+        self.timeout = 10
+        '每次发送数据的时限（秒）'
+        self.hubs = []
+        '加入的发布/订阅中心'
+        self.outbox = []
+        '发布/订阅中心放入的已编码的帧'
+        self.dropped = False
+        '是否因消费过慢被发布/订阅中心移除，移除后以 1008 关闭连接'
+        self.ready = asyncio.Event()
+        '发送队列中有新的帧'
+        self.task = None
+        '发送队列的发送任务'
+        self.lock = asyncio.Lock()
+        '发送数据的锁'
+
+    def get_response(self, head: bool = False):
+        """
+        获取握手响应（101 Switching Protocols）生成器，连接随后由服务器保持
+
+        Returns:
+            产生握手响应的生成器
+        """
+        accept = binascii.b2a_base64(hashlib.sha1((self.key + self.GUID).encode()).digest()).strip().decode()
+        yield ("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+               "Sec-WebSocket-Accept: {}\r\n".format(accept) +
+               "".join(["{}: {}\r\n".format(k, v) for k, v in self.headers.items()]) + "\r\n").encode()
+
+    def space(self):
+        """接收缓冲区的剩余空间（字节），每次接收的数据不能超过该长度"""
+        return len(self.buf) - self.n
+
+    def feed(self, data):
+        """将接收到的数据追加到接收缓冲区"""
+        memoryview(self.buf)[self.n:self.n + len(data)] = data
+        self.n += len(data)
+
+    def parse(self):
+        """
+        从接收缓冲区中取出一个完整的帧并处理
+
+        Returns:
+            (int, data) / None: (OP_TEXT, str) 或 (OP_BINARY, bytes) 为完整的消息，(OP_PING, bytes) 需要回复 pong，
+                (OP_CLOSE, int) 需要以该关闭代码关闭连接（包括协议错误与消息过大），(OP_CONT, None) 为无需处理的帧；
+                接收缓冲区中没有完整的帧时为 None
+        """
+        buf = self.buf
+        n = self.n
+        if n < 2:
+            return None
+        length = buf[1] & 0x7f
+        h = 2  # 帧头的长度
+        if length == 126:
+            if n < 4:
+                return None
+            length = buf[2] << 8 | buf[3]
+            h = 4
+        elif length == 127:
+            if n < 10:
+                return None
+            length = int.from_bytes(bytes(buf[2:10]), 'big')
+            h = 10
+        fin = buf[0] & 0x80
+        opcode = buf[0] & 0x0f
+        if buf[0] & 0x70 or not buf[1] & 0x80:  # 不支持扩展，客户端发送的帧必须使用掩码
+            return self.OP_CLOSE, 1002
+        if opcode >= self.OP_CLOSE:
+            if opcode > self.OP_PONG or length > 125 or not fin:
+                return self.OP_CLOSE, 1002
+        elif opcode > self.OP_BINARY or (opcode == self.OP_CONT) != (self.opcode != 0):
+            return self.OP_CLOSE, 1002  # 未知的类型，或者分片的顺序错误
+        elif self.size + length > len(self.message):  # 在接收完整的帧之前拒绝过大的消息
+            return self.OP_CLOSE, 1009
+        if n < h + 4 + length:
+            return None
+        m = buf[h:h + 4]
+        h += 4
+        for i in range(length):  # 就地解除掩码
+            buf[h + i] ^= m[i & 3]
+        payload = memoryview(buf)[h:h + length]
+        result = self.OP_CONT, None
+        if opcode == self.OP_PING:
+            result = opcode, bytes(payload)
+        elif opcode == self.OP_CLOSE:
+            result = opcode, payload[0] << 8 | payload[1] if length >= 2 else 1000
+        elif opcode != self.OP_PONG:
+            if opcode:
+                self.opcode = opcode
+            memoryview(self.message)[self.size:self.size + length] = payload
+            self.size += length
+            if fin:  # 消息的最后一帧
+                data = bytes(memoryview(self.message)[:self.size])
+                result = self.opcode, data
+                if self.opcode == self.OP_TEXT:
+                    try:
+                        result = self.opcode, data.decode()
+                    except UnicodeError:
+                        result = self.OP_CLOSE, 1007
+                self.opcode = 0
+                self.size = 0
+        end = h + length
+        memoryview(buf)[:n - end] = memoryview(buf)[end:n]
+        self.n = n - end
+        return result
+
+    @staticmethod
+    def header(opcode: int, length: int):
+        """生成服务器发送的帧（不使用掩码）的帧头"""
+        if length < 126:
+            return bytes((0x80 | opcode, length))
+        if length < 65536:
+            return bytes((0x80 | opcode, 126, length >> 8, length & 0xff))
+        return bytes((0x80 | opcode, 127)) + length.to_bytes(8, 'big')
+
+    async def _send(self, opcode: int, data):
+        """发送一个帧"""
+        await self._write(self.header(opcode, len(data)), data)
+
+    async def _write(self, head: bytes, data=b''):
+        """写入数据；帧头与负载一起写入后再等待发送完成，同一时间只有一个任务等待发送"""
+        async with self.lock:
+            self.io.write(head)
+            if data:
+                self.io.write(data)
+            await _drain(self.io, self.timeout)
+
+    async def _deliver(self):
+        """后台任务：发送发布/订阅中心放入发送队列的帧，因消费过慢被移除时以 1008 关闭连接"""
+        try:
+            while not self.closed:
+                if self.outbox:
+                    await self._write(self.outbox.pop(0))
+                elif self.dropped:
+                    await self.close(1008)
+                elif not self.hubs:
+                    break
+                else:
+                    self.ready.clear()
+                    await self.ready.wait()
+        except Exception:  # 连接已断开，由接收数据的任务处理
+            pass
+        self.task = None
+
+    async def send(self, data):
+        """
+        发送消息
+
+        Args:
+            data: str 作为文本消息发送，bytes 作为二进制消息发送
+        """
+        if isinstance(data, str):
+            await self._send(self.OP_TEXT, data.encode())
+        else:
+            await self._send(self.OP_BINARY, data)
+
+    async def ping(self, data: bytes = b''):
+        """发送 ping，客户端会回复 pong"""
+        await self._send(self.OP_PING, data)
+
+    async def close(self, code: int = 1000):
+        """发送关闭帧，客户端回复关闭帧后连接关闭"""
+        if not self.closed:
+            self.closed = True
+            await self._send(self.OP_CLOSE, bytes((code >> 8, code & 0xff)))
+
+    async def receive(self, data):
+        """
+        处理接收到的数据：回复 ping，调用 on_message 处理完整的消息
+
+        Returns:
+            int / None: 连接需要关闭时为关闭代码
+        """
+        self.feed(data)
+        while True:
+            event = self.parse()
+            if event is None:
+                return None
+            opcode, value = event
+            if opcode == self.OP_PING:
+                await self._send(self.OP_PONG, value)
+            elif opcode == self.OP_CLOSE:
+                await self.close(value)
+                return value
+            elif opcode != self.OP_CONT:
+                await self._call(self.on_message, self, value)
+
+    @staticmethod
+    async def _call(func, *args):
+        """调用回调函数，回调函数可以使用 async def 定义"""
+        if func is not None:
+            if _is_async(func):
+                await func(*args)
+            else:
+                func(*args)
+
+    async def _serve(self, app, reader, writer, data: bytes):
+        """
+        处理 WebSocket 连接：接收并处理客户端发送的帧，长时间没有数据时发送 ping，直到连接关闭
+
+        Args:
+            app: EasyWeb 对象
+            reader: 用于从客户端读取数据的流
+            writer: 用于向客户端发送数据的流
+            data: 读取器中已缓冲的数据
+
+        Returns:
+            int: 0，WebSocket 帧不计入已发送的字节数
+        """
+        self.io = writer
+        self.timeout = app.write_timeout
+        code = 1006  # 连接异常断开
+        try:
+            await self._call(self.on_open, self)
+            while True:
+                if data:
+                    code = await self.receive(data)
+                    if code is not None:
+                        break
+                    code = 1006
+                try:
+                    data = await asyncio.wait_for(reader.read(self.space()), self.PING)
+                except asyncio.TimeoutError:
+                    await self.ping()
+                    data = None
+                    continue
+                if not data:  # 客户端已关闭连接
+                    break
+            # 等待客户端关闭连接并丢弃剩余的数据，避免未读取的数据导致连接被重置，客户端收不到关闭帧
+            await asyncio.wait_for(_discard(reader), 1)
+        except (OSError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            print("[WARN] EasyWEB: {}".format(e))
+        finally:
+            self.closed = True
+            for hub in self.hubs[:]:
+                hub.leave(self)
+            self.ready.set()
+            try:
+                await self._call(self.on_close, self, code)
+            except Exception as e:
+                print("[WARN] EasyWEB: {}".format(e))
+        return 0
+
+    async def _end(self):
+        """连接未能保持（超出 max_streams）时由服务器调用，之后不再发送数据"""
+        self.closed = True
+
+
+async def _discard(reader):
+    """读取并丢弃客户端发送的数据，直到客户端关闭连接"""
+    while await reader.read(256):
+        pass
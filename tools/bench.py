@@ -0,0 +1,234 @@
+# EasyWeb 端到端基准测试（在主机上运行，需要 CPython 3）
+#
+# 在 MicroPython unix 版本或 CPython 中启动 tools/bench_app.py，使用本地的负载生成器访问典型的路由，
+# 统计每秒请求数、延迟的 p50 / p99 与堆内存峰值，并可以与保存的基准结果进行比较。
+# 堆内存峰值在每个场景之后单独测量（HEAP_DURATION 秒），跟踪内存分配的开销不影响吞吐量与延迟。
+#
+# 用法：
+#   python3 tools/bench.py                                  # 使用 micropython（不存在时使用 python3）测试全部版本
+#   python3 tools/bench.py -b easyweb -r python3 -c 8 -d 10
+#   python3 tools/bench.py --save bench_baseline.json       # 保存为基准结果
+#   python3 tools/bench.py --baseline bench_baseline.json   # 与基准结果比较，出现性能退化时返回值为 1
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ('easyweb', 'easyweb_thread', 'easyweb_single')
+FORM = b'ssid=EasyWeb&password=12345678&mode=sta&channel=6&hidden=0'
+SCENARIOS = {
+    'json': b'GET /json HTTP/1.1\r\nHost: bench\r\n\r\n',
+    'template': b'GET /template HTTP/1.1\r\nHost: bench\r\n\r\n',
+    'file': b'GET /file HTTP/1.1\r\nHost: bench\r\n\r\n',
+    'form': b'POST /form HTTP/1.1\r\nHost: bench\r\nContent-Type: application/x-www-form-urlencoded\r\n'
+            b'Content-Length: ' + str(len(FORM)).encode() + b'\r\n\r\n' + FORM,
+}
+'场景：小型 JSON，模板渲染，发送大文件，表单 POST'
+HEAP_DURATION = 2
+'测量堆内存峰值时每个场景的负载时间（秒），不超过 --duration'
+TOLERANCE = {'rps': -0.10, 'p50': 0.20, 'p99': 0.30, 'peak_heap': 0.20}
+'与基准结果比较时允许的变化幅度，超出时视为性能退化'
+
+
+def request(port, raw, timeout=10):
+    """
+    发送一个请求并读取完整的响应
+
+    Returns:
+        (int, int): 状态码与响应长度，连接出错时状态码为 0
+    """
+    s = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+    try:
+        s.sendall(raw)
+        chunks = []
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    except OSError:
+        return 0, 0
+    finally:
+        s.close()
+    data = b''.join(chunks)
+    try:
+        return int(data[9:12]), len(data)
+    except ValueError:
+        return 0, len(data)
+
+
+def get_json(port, path):
+    """请求一个 JSON 路由并解析响应体"""
+    s = socket.create_connection(('127.0.0.1', port), timeout=10)
+    s.sendall('GET {} HTTP/1.1\r\n\r\n'.format(path).encode())
+    data = b''
+    while True:
+        chunk = s.recv(65536)
+        if not chunk:
+            break
+        data += chunk
+    s.close()
+    return json.loads(data.split(b'\r\n\r\n', 1)[1])
+
+
+def percentile(values, p):
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def load(port, raw, duration, concurrency):
+    """
+    在指定时间内使用多个线程持续发送请求
+
+    Returns:
+        dict: 每秒请求数，延迟 p50 / p99（毫秒），错误数
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker():
+        local = []
+        failed = 0
+        while time.monotonic() < deadline:
+            t = time.perf_counter()
+            status, _ = request(port, raw)
+            if status == 200:
+                local.append((time.perf_counter() - t) * 1000)
+            else:
+                failed += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50': round(percentile(latencies, 0.50), 3),
+        'p99': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def start_server(runtime, backend, port, trace=False):
+    """
+    启动基准测试应用，并等待其开始监听
+
+    Args:
+        trace: CPython 中是否从启动开始跟踪内存分配（会降低吞吐量），用于观察 /_mem 中的内存增长
+    """
+    command = [runtime, os.path.join(ROOT, 'tools', 'bench_app.py'), backend, str(port)]
+    if trace:
+        command.append('trace')
+    proc = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError('{} exited: {}'.format(backend, proc.stderr.read().decode()))
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('{} did not start listening on port {}'.format(backend, port))
+
+
+def bench_backend(runtime, backend, port, duration, concurrency, scenarios):
+    """对一个版本运行全部场景"""
+    if backend == 'easyweb_single':
+        concurrency = 1  # 单线程版本同一时间只处理一个连接
+    proc = start_server(runtime, backend, port)
+    results = {}
+    try:
+        for name in scenarios:
+            request(port, SCENARIOS[name])  # 预热
+            result = load(port, SCENARIOS[name], duration, concurrency)
+            get_json(port, '/_heap?start=1')  # 单独测量堆内存峰值
+            load(port, SCENARIOS[name], min(duration, HEAP_DURATION), concurrency)
+            result['peak_heap'] = get_json(port, '/_heap?stop=1')['peak']
+            results[name] = result
+            print('  {:<9} {:>8.1f} req/s  p50 {:>8.3f} ms  p99 {:>8.3f} ms  peak heap {:>9} B  errors {}'.format(
+                name, result['rps'], result['p50'], result['p99'], result['peak_heap'], result['errors']))
+    finally:
+        proc.terminate()
+        proc.wait()
+    return results
+
+
+def compare(results, baseline):
+    """
+    与基准结果比较，打印变化幅度
+
+    Returns:
+        list: 出现性能退化的项目
+    """
+    regressions = []
+    for backend, scenarios in results.items():
+        for name, result in scenarios.items():
+            base = baseline.get(backend, {}).get(name)
+            if not base:
+                continue
+            changes = []
+            for key, limit in TOLERANCE.items():
+                if not base.get(key):
+                    continue
+                change = (result[key] - base[key]) / base[key]
+                changes.append('{} {:+.1%}'.format(key, change))
+                if (limit < 0 and change < limit) or (limit > 0 and change > limit):
+                    regressions.append('{}/{} {}'.format(backend, name, key))
+            print('  {}/{}: {}'.format(backend, name, ', '.join(changes)))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EasyWeb end-to-end benchmark')
+    parser.add_argument('-b', '--backend', action='append', choices=BACKENDS,
+                        help='backend to benchmark (repeatable, default: all)')
+    parser.add_argument('-r', '--runtime', default=shutil.which('micropython') and 'micropython' or sys.executable,
+                        help='interpreter running the server (default: micropython if installed, else this python)')
+    parser.add_argument('-s', '--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='scenario to run (repeatable, default: all)')
+    parser.add_argument('-d', '--duration', type=float, default=5, help='seconds per scenario')
+    parser.add_argument('-c', '--concurrency', type=int, default=4, help='concurrent client connections')
+    parser.add_argument('-p', '--port', type=int, default=8321)
+    parser.add_argument('--save', metavar='FILE', help='store the results as a baseline')
+    parser.add_argument('--baseline', metavar='FILE', help='compare the results against a stored baseline')
+    args = parser.parse_args()
+
+    results = {}
+    for backend in args.backend or BACKENDS:
+        print('{} ({})'.format(backend, args.runtime))
+        results[backend] = bench_backend(args.runtime, backend, args.port, args.duration, args.concurrency,
+                                         args.scenario or sorted(SCENARIOS))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print('Compared with {}:'.format(args.baseline))
+        regressions = compare(results, baseline)
+        if regressions:
+            print('Regressions: ' + ', '.join(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
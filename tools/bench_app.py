@@ -0,0 +1,139 @@
+# 基准测试使用的 EasyWeb 应用，可以在 MicroPython unix 版本或 CPython 中运行
+#
+# 用法：
+#   micropython tools/bench_app.py <easyweb | easyweb_thread | easyweb_single> [port] [trace]
+#   python3 tools/bench_app.py <easyweb | easyweb_thread | easyweb_single> [port] [trace]
+#
+# CPython 中只在测量堆内存峰值期间（/_heap?start=1 到 /_heap?stop=1）使用 tracemalloc 跟踪内存分配，
+# 避免跟踪的开销影响吞吐量与延迟的测量；指定 trace 时从启动开始跟踪，用于 soak.py 观察 /_mem 中的内存增长
+import gc
+import sys
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+
+
+def _root():
+    """项目根目录"""
+    parts = __file__.replace('\\', '/').split('/')
+    if len(parts) == 1:  # 在 tools 目录中运行
+        return '..'
+    return '/'.join(parts[:-2]) or '.'
+
+
+ROOT = _root()
+LIB = ROOT + '/lib'
+FILE = '/tmp/easyweb_bench.bin'
+'用于 send_file 测试的大文件'
+FILE_SIZE = 64 * 1024
+
+
+def heap():
+    """当前的堆内存使用量（字节），CPython 中没有跟踪内存分配时为 0"""
+    if MICROPYTHON:
+        return gc.mem_alloc()
+    import tracemalloc
+    return tracemalloc.get_traced_memory()[0]
+
+
+def largest_block():
+    """
+    堆中最大的连续空闲块（字节），用于观察内存碎片
+    通过二分查找可以成功分配的最大 bytearray 估算，CPython 中返回 None
+    """
+    if not MICROPYTHON:
+        return None
+    gc.collect()
+    low, high = 0, gc.mem_free()
+    while high - low > 64:
+        mid = (low + high) // 2
+        try:
+            bytearray(mid)
+            low = mid
+        except MemoryError:
+            high = mid
+    return low
+
+
+def main():
+    sys.path.insert(0, LIB)
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'easyweb'
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8080
+    trace = len(sys.argv) > 3 and sys.argv[3] == 'trace'
+    if not MICROPYTHON:
+        import tracemalloc
+        if trace:
+            tracemalloc.start()
+    ew_module = __import__(backend)
+    # 准备大文件
+    try:
+        with open(FILE, 'rb') as f:
+            size = len(f.read())
+    except OSError:
+        size = 0
+    if size != FILE_SIZE:
+        with open(FILE, 'wb') as f:
+            block = bytes(range(256)) * 4
+            for _ in range(FILE_SIZE // len(block)):
+                f.write(block)
+
+    ew = ew_module.EasyWeb()
+    ew.max_conns = 64
+    peak = [0]
+
+    def sample(request, timings):
+        """MicroPython 中没有内存分配的峰值统计，在每个请求结束后采样"""
+        h = heap()
+        if h > peak[0]:
+            peak[0] = h
+
+    template = ROOT + '/web/time.html'
+
+    @ew.route('/json')
+    def small_json(request):
+        return {'temperature': 23.5, 'humidity': 41, 'ok': True}
+
+    @ew.route('/template')
+    def template_page(request):
+        return ew_module.render_template(template, time=123456)
+
+    @ew.route('/file')
+    def large_file(request):
+        return ew_module.send_file(FILE)
+
+    @ew.route('/form', methods=['POST'])
+    def form(request):
+        return {'fields': len(request.form or {})}
+
+    @ew.route('/_heap')
+    def heap_stats(request):
+        """堆内存峰值的测量：?start=1 开始测量，?stop=1 结束测量并返回峰值"""
+        args = request.args or {}
+        if args.get('start'):
+            if MICROPYTHON:
+                peak[0] = heap()
+                ew.enable_profiling(sample, slow_ms=1000000, size=0)
+            else:
+                tracemalloc.start()
+                tracemalloc.reset_peak()
+        elif args.get('stop'):
+            if MICROPYTHON:
+                ew.profiler = None
+            else:
+                peak[0] = tracemalloc.get_traced_memory()[1]
+                if not trace:
+                    tracemalloc.stop()
+        return {'current': heap(), 'peak': peak[0]}
+
+    @ew.route('/_mem')
+    def mem_stats(request):
+        gc.collect()
+        result = {'alloc': heap(), 'free': gc.mem_free() if MICROPYTHON else None}
+        result['max_block'] = largest_block()
+        return result
+
+    print('EasyWeb bench app: {} on port {}'.format(backend, port))
+    ew.run('127.0.0.1', port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# EasyWeb 热点函数的微基准测试，可以在 MicroPython unix 版本或 CPython 中运行
+#
+# 统计每次调用的耗时与内存分配：
+#   - MicroPython：在关闭垃圾回收的情况下，使用 gc.mem_alloc() 的差值计算每次调用分配的字节数
+#   - CPython：使用 tracemalloc 统计单次调用的临时内存峰值
+#
+# 用法：
+#   micropython tools/microbench.py [easyweb | easyweb_thread | easyweb_single] [次数]
+#   python3 tools/microbench.py [easyweb | easyweb_thread | easyweb_single] [次数]
+import gc
+import sys
+import time
+
+from bench_app import ROOT, LIB
+
+MICROPYTHON = sys.implementation.name == 'micropython'
+
+
+def measure(func, n):
+    """
+    测量函数的耗时与内存分配
+
+    Returns:
+        (float, float): 每次调用的耗时（微秒）与分配的字节数
+    """
+    func()  # 预热，例如缓存属性、打开文件
+    gc.collect()
+    if MICROPYTHON:
+        gc.disable()
+        start_mem = gc.mem_alloc()
+        start = time.ticks_us()
+        for _ in range(n):
+            func()
+        us = time.ticks_diff(time.ticks_us(), start)
+        alloc = gc.mem_alloc() - start_mem
+        gc.enable()
+        return us / n, alloc / n
+    import tracemalloc
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(n):
+        func()
+    us = (time.perf_counter() - start) * 1000000
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    func()
+    alloc = tracemalloc.get_traced_memory()[1] - base
+    return us / n, alloc
+
+
+def benchmarks(ew_module):
+    """
+    构造各个微基准测试
+
+    Returns:
+        list: [(名称, 函数, 次数倍率), ...]
+    """
+    encoded = '%E4%BD%A0%E5%A5%BD+EasyWeb%21%20a%2Fb%3Fc%3Dd'
+    decoded = '你好 EasyWeb! a/b?c=d'
+
+    request = ew_module._Request()
+    request.full_path = '/search?q=easy%20web&page=2&size=20&sort=name&order=asc'
+    request.headers['Cookie'] = 'session=abc123; theme=dark; lang=zh-CN; token=%E4%BD%A0'
+
+    def args():
+        request._args = None
+        return request.args
+
+    def cookies():
+        request._cookies = None
+        return request.cookies
+
+    # 路由匹配：在 20 个路由中匹配最后的动态路由
+    ew = ew_module.EasyWeb()
+    for i in range(18):
+        ew.route('/page{}'.format(i))(lambda r: '')
+    ew.route('/static/<path>')(lambda r: '')
+    ew.route('/user/<string>')(lambda r: '')
+    route_request = ew_module._Request()
+    route_request.path = '/user/easyweb'
+
+    def find_route():
+        return ew._find_route(route_request)
+
+    def get_response():
+        response = ew_module._Response()
+        response.headers.update({'Cache-Control': 'no-cache', 'X-Powered-By': 'EasyWeb', 'Connection': 'close'})
+        response.set_cookie('session', 'abc123', 3600)
+        response.data = b'<h1>Hello EasyWeb</h1>'
+        for _ in response.get_response():
+            pass
+
+    template = ROOT + '/web/time.html'
+
+    def render_template():
+        for _ in ew_module.render_template(template, time=1700000000):
+            pass
+
+    return [
+        ('url_decode', lambda: ew_module.url_decode(encoded), 1),
+        ('url_encode', lambda: ew_module.url_encode(decoded), 1),
+        ('_Request.args', args, 1),
+        ('_Request.cookies', cookies, 1),
+        ('route matching', find_route, 1),
+        ('get_response', get_response, 1),
+        ('render_template', render_template, 10),
+    ]
+
+
+def main():
+    sys.path.insert(0, LIB)
+    backend = sys.argv[1] if len(sys.argv) > 1 else 'easyweb'
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    ew_module = __import__(backend)
+    print('{} ({} {})'.format(backend, sys.implementation.name, sys.version.split()[0]))
+    print('{:<18} {:>12} {:>14}'.format('benchmark', 'us/call', 'alloc B/call'))
+    for name, func, divisor in benchmarks(ew_module):
+        us, alloc = measure(func, max(n // divisor, 1))
+        print('{:<18} {:>12.2f} {:>14.1f}'.format(name, us, alloc))
+
+
+if __name__ == '__main__':
+    main()
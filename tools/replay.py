@@ -0,0 +1,155 @@
+# EasyWeb 请求回放（在主机上运行，需要 CPython 3）
+#
+# 读取 EasyWeb.enable_capture() 录制的文件，按原始的时间间隔（或加速）将请求依次发送给服务器，
+# 统计延迟分布并记录每个响应的摘要，可以保存结果并与另一个版本的结果进行比较。
+#
+# 用法：
+#   python3 tools/replay.py capture.bin --host 192.168.4.1 --port 80            # 按原始速度回放
+#   python3 tools/replay.py capture.bin --port 8080 --speed 10 --save old.json  # 以 10 倍速回放并保存结果
+#   python3 tools/replay.py capture.bin --port 8080 --speed 0 --baseline old.json
+#                                                     # 不等待，与保存的结果比较，出现性能退化或响应不同时返回值为 1
+import argparse
+import hashlib
+import json
+import os
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench import TOLERANCE, percentile  # noqa: E402
+
+
+def load_capture(file):
+    """
+    读取录制文件
+
+    Returns:
+        list: 按到达时间排序的 (到达时间（毫秒）, 状态码, 处理耗时（微秒）, 原始请求)
+    """
+    records = []
+    with open(file, 'rb') as f:
+        data = f.read()
+    pos = 0
+    while pos < len(data):
+        end = data.index(b'\n', pos)
+        arrival, status, us, size = (int(v) for v in data[pos:end].split())
+        records.append((arrival, status, us, data[end + 1:end + 1 + size]))
+        pos = end + 1 + size
+    records.sort(key=lambda record: record[0])
+    return records
+
+
+def send(host, port, raw, timeout):
+    """
+    发送原始请求并读取完整的响应
+
+    Returns:
+        bytes: 响应数据，连接被重置时为已收到的部分
+    """
+    s = socket.create_connection((host, port), timeout=timeout)
+    chunks = []
+    try:
+        s.sendall(raw)
+        while True:
+            data = s.recv(65536)
+            if not data:
+                break
+            chunks.append(data)
+    except OSError:
+        pass
+    finally:
+        s.close()
+    return b''.join(chunks)
+
+
+def replay(records, host, port, speed, timeout):
+    """
+    依次回放请求，speed 为 0 时不等待；服务器处理不及时时不会补偿，后续请求立即发送
+
+    Returns:
+        list: 每个请求的 (延迟（毫秒）, 响应的 SHA-1 摘要)
+    """
+    results = []
+    start = time.monotonic()
+    for arrival, _, _, raw in records:
+        if speed:
+            delay = arrival / 1000 / speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        t = time.perf_counter()
+        response = send(host, port, raw, timeout)
+        results.append(((time.perf_counter() - t) * 1000, hashlib.sha1(response).hexdigest()))
+    return results
+
+
+def summary(records, results):
+    """汇总延迟分布与响应摘要"""
+    latencies = [ms for ms, _ in results]
+    return {
+        'requests': len(results),
+        'p50': round(percentile(latencies, 0.50), 3),
+        'p90': round(percentile(latencies, 0.90), 3),
+        'p99': round(percentile(latencies, 0.99), 3),
+        'max': round(max(latencies), 3) if latencies else 0.0,
+        'captured_p50': round(percentile([us / 1000 for _, _, us, _ in records], 0.50), 3),
+        'responses': [digest for _, digest in results],
+    }
+
+
+def compare(result, baseline, records):
+    """
+    与保存的结果比较延迟与响应内容
+
+    Returns:
+        list: 出现性能退化或响应不同的项目
+    """
+    problems = []
+    for key in ('p50', 'p99'):
+        if not baseline.get(key):
+            continue
+        change = (result[key] - baseline[key]) / baseline[key]
+        print('  {}: {:.3f} ms -> {:.3f} ms ({:+.1%})'.format(key, baseline[key], result[key], change))
+        if change > TOLERANCE[key]:
+            problems.append(key)
+    different = [i for i, (a, b) in enumerate(zip(result['responses'], baseline['responses'])) if a != b]
+    if len(result['responses']) != len(baseline['responses']):
+        problems.append('request count')
+    if different:
+        problems.append('{} responses'.format(len(different)))
+        for i in different[:10]:
+            print('  response differs: #{} {}'.format(i, records[i][3].split(b'\r\n', 1)[0].decode('utf-8', 'replace')))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay traffic captured by EasyWeb.enable_capture()')
+    parser.add_argument('capture', help='capture file copied from the board')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('-p', '--port', type=int, default=80)
+    parser.add_argument('--speed', type=float, default=1, help='replay speed factor, 0 sends without waiting')
+    parser.add_argument('--timeout', type=float, default=10, help='socket timeout in seconds')
+    parser.add_argument('--save', metavar='FILE', help='store latencies and response digests')
+    parser.add_argument('--baseline', metavar='FILE', help='compare against stored results')
+    args = parser.parse_args()
+
+    records = load_capture(args.capture)
+    print('Replaying {} requests to {}:{} (speed {})'.format(len(records), args.host, args.port, args.speed or 'max'))
+    result = summary(records, replay(records, args.host, args.port, args.speed, args.timeout))
+    print('  latency p50 {:.3f} ms  p90 {:.3f} ms  p99 {:.3f} ms  max {:.3f} ms  (captured p50 {:.3f} ms)'.format(
+        result['p50'], result['p90'], result['p99'], result['max'], result['captured_p50']))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(result, f)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print('Compared with {}:'.format(args.baseline))
+        problems = compare(result, baseline, records)
+        if problems:
+            print('Regressions: ' + ', '.join(problems))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+# EasyWeb 长时间浸泡测试与内存泄漏检测（在主机上运行，需要 CPython 3）
+#
+# 在 MicroPython unix 版本或 CPython 中启动 tools/bench_app.py，持续发送大量混合请求，
+# 包括正常请求、畸形请求、错误路径以及在响应过程中断开的连接。
+# 每轮结束后记录服务器在垃圾回收之后的堆内存使用量、空闲内存与最大连续空闲块，
+# 内存持续增长时返回值为 1，并列出导致增长的请求类型。
+#
+# 用法：
+#   python3 tools/soak.py                                   # 使用 micropython（不存在时使用 python3）测试全部版本
+#   python3 tools/soak.py -b easyweb_single -n 500000 --csv soak.csv
+import argparse
+import os
+import shutil
+import socket
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench import BACKENDS, SCENARIOS, get_json, start_server  # noqa: E402
+
+REQUESTS = {
+    'json': (SCENARIOS['json'], None),
+    'template': (SCENARIOS['template'], None),
+    'file': (SCENARIOS['file'], None),
+    'form': (SCENARIOS['form'], None),
+    'not_found': (b'GET /missing/page?x=1 HTTP/1.1\r\nHost: soak\r\n\r\n', None),
+    'bad_method': (b'DELETE /json HTTP/1.1\r\nHost: soak\r\n\r\n', None),
+    'malformed': (b'NOT A REQUEST\r\n\r\n', None),
+    'bad_version': (b'GET /json HTTP/9.9\r\n\r\n', None),
+    'long_line': (b'GET /' + b'a' * 4096 + b' HTTP/1.1\r\n\r\n', None),
+    'huge_header': (b'GET /json HTTP/1.1\r\nX-Pad: ' + b'b' * 8192 + b'\r\n\r\n', None),
+    'bad_length': (b'POST /form HTTP/1.1\r\nContent-Length: abc\r\n\r\n', None),
+    'too_large': (b'POST /form HTTP/1.1\r\nContent-Length: 10000000\r\n\r\n', None),
+    'truncated_body': (b'POST /form HTTP/1.1\r\nContent-Length: 100\r\n\r\nssid=abc', 0),
+    'truncated_headers': (b'GET /json HTTP/1.1\r\nHost: so', 0),
+    'abort_response': (SCENARIOS['file'], 512),
+}
+'请求类型：(原始请求, 读取的字节数)，读取的字节数为 None 时读取完整的响应，为 0 时发送后立即断开'
+
+
+def exchange(port, raw, read=None, timeout=10):
+    """发送原始请求，按要求读取响应后关闭连接，返回读取的字节数"""
+    s = socket.create_connection(('127.0.0.1', port), timeout=timeout)
+    received = 0
+    try:
+        s.sendall(raw)
+        while read != 0:
+            data = s.recv(65536)
+            if not data:
+                break
+            received += len(data)
+            if read is not None and received >= read:
+                break
+    except OSError:
+        pass
+    finally:
+        s.close()
+    return received
+
+
+def memory(port):
+    """读取服务器的内存统计，服务器因积压的连接返回 503 时等待后重试"""
+    for _ in range(100):
+        try:
+            return get_json(port, '/_mem')
+        except ValueError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not recover from the backlog')
+
+
+def leaking(values, slack):
+    """
+    判断数值是否持续增长：后半段的最小值比前半段的最大值高出 slack 以上
+
+    Args:
+        values: 按时间顺序的采样值
+        slack: 允许的波动（字节）
+    """
+    values = [v for v in values if v is not None]
+    if len(values) < 4:
+        return False
+    half = len(values) // 2
+    return min(values[half:]) - max(values[:half]) > slack
+
+
+def soak_backend(runtime, backend, port, total, rounds, slack, kinds):
+    """
+    对一个版本运行浸泡测试
+
+    Returns:
+        (list, list): 每轮的内存采样，疑似泄漏的请求类型
+    """
+    proc = start_server(runtime, backend, port, trace=True)
+    samples = []
+    deltas = {kind: [] for kind in kinds}
+    per_kind = max(total // (rounds * len(kinds)), 1)
+    try:
+        for kind in kinds:  # 预热，使缓存、对象池等达到稳定状态
+            exchange(port, *REQUESTS[kind])
+        start = time.monotonic()
+        mem = memory(port)
+        samples.append(mem)
+        for i in range(rounds):
+            for kind in kinds:
+                raw, read = REQUESTS[kind]
+                for _ in range(per_kind):
+                    exchange(port, raw, read)
+                after = memory(port)
+                deltas[kind].append(after['alloc'] - mem['alloc'])
+                mem = after
+            samples.append(mem)
+            print('  round {:>3}/{}  {:>8} requests  {:>7.1f} s  alloc {:>9} B  free {:>9} B  max block {:>9} B'.format(
+                i + 1, rounds, (i + 1) * per_kind * len(kinds), time.monotonic() - start,
+                mem['alloc'], mem['free'] if mem['free'] is not None else '-',
+                mem['max_block'] if mem['max_block'] is not None else '-'))
+            if proc.poll() is not None:
+                raise RuntimeError('{} exited: {}'.format(backend, proc.stderr.read().decode()))
+    finally:
+        proc.terminate()
+        proc.wait()
+    # 每轮都使内存增加，且总增量超过允许波动的请求类型
+    suspects = []
+    for kind, values in deltas.items():
+        growth = sum(values)
+        if growth > slack and sum(1 for v in values if v > 0) >= len(values) * 0.8:
+            suspects.append((kind, growth))
+    suspects.sort(key=lambda item: -item[1])
+    return samples, suspects
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EasyWeb soak test and leak detection')
+    parser.add_argument('-b', '--backend', action='append', choices=BACKENDS,
+                        help='backend to test (repeatable, default: all)')
+    parser.add_argument('-r', '--runtime', default=shutil.which('micropython') and 'micropython' or sys.executable,
+                        help='interpreter running the server (default: micropython if installed, else this python)')
+    parser.add_argument('-k', '--kind', action='append', choices=sorted(REQUESTS),
+                        help='request type to send (repeatable, default: all)')
+    parser.add_argument('-n', '--requests', type=int, default=200000, help='total number of requests per backend')
+    parser.add_argument('--rounds', type=int, default=20, help='number of memory samples')
+    parser.add_argument('--slack', type=int, default=4096, help='tolerated heap growth in bytes')
+    parser.add_argument('-p', '--port', type=int, default=8322)
+    parser.add_argument('--csv', metavar='FILE', help='write the memory samples to a CSV file')
+    args = parser.parse_args()
+
+    failed = []
+    rows = []
+    for backend in args.backend or BACKENDS:
+        print('{} ({})'.format(backend, args.runtime))
+        samples, suspects = soak_backend(args.runtime, backend, args.port, args.requests, args.rounds,
+                                         args.slack, args.kind or sorted(REQUESTS))
+        for i, mem in enumerate(samples):
+            rows.append((backend, i, mem['alloc'], mem['free'], mem['max_block']))
+        problems = []
+        if leaking([mem['alloc'] for mem in samples], args.slack):
+            problems.append('heap usage keeps growing')
+        if leaking([-mem['max_block'] if mem['max_block'] is not None else None for mem in samples], args.slack):
+            problems.append('largest free block keeps shrinking')
+        if problems:
+            failed.append(backend)
+            print('  LEAK: ' + ', '.join(problems))
+        for kind, growth in suspects:
+            print('  suspect: {:<18} +{} B'.format(kind, growth))
+    if args.csv:
+        with open(args.csv, 'w') as f:
+            f.write('backend,round,alloc,free,max_block\n')
+            for row in rows:
+                f.write(','.join('' if v is None else str(v) for v in row) + '\n')
+    if failed:
+        print('Leaking: ' + ', '.join(failed))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()